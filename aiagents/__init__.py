@@ -1,6 +1,11 @@
-from .cml_agents import *
-from .panel_utils import CustomPanelCallbackHandler
-from .crew import StartCrewInitialization, StartCrewInteraction
-from .config import configuration
+from .lazy_imports import lazy_exports
 
 __all__ = ["cml_agents", "CustomPanelCallbackHandler", "StartCrewInitialization", "StartCrewInteraction", "configuration"]
+
+# the agent stack is imported on first use, see aiagents.warmup
+__getattr__ = lazy_exports(__name__, {
+    "CustomPanelCallbackHandler": ".panel_utils",
+    "StartCrewInitialization": ".crew",
+    "StartCrewInteraction": ".crew",
+    "configuration": ".config",
+})
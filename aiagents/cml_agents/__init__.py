@@ -1,6 +1,4 @@
-from .tools import *
-from .parse_for_manager import *
-from .tasks import *
+from aiagents.lazy_imports import lazy_exports
 
 __all__ = [
     # "SwaggerSplitter",
@@ -8,3 +6,5 @@ __all__ = [
     "generated_directory_lister",
     "swagger_directory_lister",
 ]
+
+__getattr__ = lazy_exports(__name__, {name: ".tools" for name in __all__})
@@ -1,9 +1,37 @@
 from pprint import pprint
 from aiagents.config import configuration
 import re
+from langchain_core.callbacks import BaseCallbackHandler
+from aiagents.custom_threading.cancellation import check_cancelled
 from aiagents.panel_utils.panel_utils import CustomPanelCallbackHandler
 
+
+class CancellationCallbackHandler(BaseCallbackHandler):
+    """
+    Stops a cancelled crew thread at the LLM and tool boundaries of its agents,
+    before a prompt is sent or a tool runs and as soon as either returns.
+    """
+
+    raise_error = True
+
+    def on_llm_start(self, *args, **kwargs):
+        check_cancelled()
+
+    def on_chat_model_start(self, *args, **kwargs):
+        check_cancelled()
+
+    def on_llm_end(self, *args, **kwargs):
+        check_cancelled()
+
+    def on_tool_start(self, *args, **kwargs):
+        check_cancelled()
+
+    def on_tool_end(self, *args, **kwargs):
+        check_cancelled()
+
+
 def custom_agent_callback(output, *args, **kwargs):
+    check_cancelled()
     pprint(f"The callback args are {args}")
     print(output)
     if "AgentFinish" in str(args):
@@ -15,12 +43,14 @@ def custom_agent_callback(output, *args, **kwargs):
     pprint(f"The callback kwargs are {kwargs}")
 
 def custom_callback(*args, **kwargs):
+    check_cancelled()
     pprint(f"The callback args are {args}")
     pprint(f"The callback kwargs are {kwargs}")
     pass
     #pprint(f"The callback received from the agent is {formatted_answer}")
 
 def custom_initialization_callback(*args, **kwargs):
+    check_cancelled()
     pprint(f"The callback args are {args}")
     pprint(f"The callback kwargs are {kwargs}")
     pass
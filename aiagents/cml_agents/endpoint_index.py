@@ -0,0 +1,180 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import List
+
+STOP_WORDS = frozenset(
+    "a all an and any are as at be by can every for from get give how i in is it me my of on or please "
+    "show that the this to what which with you".split()
+)
+# Path and summary words describe an endpoint best, they count more than the description.
+FIELD_WEIGHTS = {"path": 3, "summary": 2, "operation": 2, "parameters": 1, "description": 1}
+# Verbs of a task that point at the HTTP method of the endpoint doing it.
+METHOD_VERBS = {
+    "get": ("get", "list", "show", "fetch", "read", "describe", "find", "search", "view"),
+    "post": ("create", "add", "new", "start", "run", "launch", "make"),
+    "patch": ("update", "edit", "change", "modify", "rename", "set"),
+    "put": ("update", "replace", "set"),
+    "delete": ("delete", "remove", "destroy"),
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower case word stems of a text, with camelCase and snake_case names split into words."""
+    words = re.findall(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+", text or "")
+    tokens = []
+    for word in words:
+        word = word.lower()
+        if word in STOP_WORDS:
+            continue
+        # a crude plural stem, so "projects" matches "project"
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def endpoint_fields(path: str, details: dict) -> dict:
+    """The searchable text of an operation of a path chunk, by field."""
+    details = details if isinstance(details, dict) else {}
+    parameters = [
+        parameter.get("name", "")
+        for parameter in details.get("parameters") or []
+        if isinstance(parameter, dict)
+    ]
+    return {
+        # placeholders such as {project_id} name the parent resource, not the endpoint
+        "path": re.sub(r"{[^}]*}", " ", path),
+        "summary": " ".join([details.get("summary") or ""] + list(details.get("tags") or [])),
+        "operation": details.get("operationId") or "",
+        "parameters": " ".join(parameters),
+        "description": details.get("description") or "",
+    }
+
+
+class EndpointIndex:
+    """
+    BM25 keyword index over the operations of one API Specification file. It is built
+    while the spec is split, kept next to its metadata file and answers free text
+    task descriptions with the best matching endpoints, so selecting an endpoint
+    does not require reading the whole metadata file.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.endpoints = []
+        self.term_frequencies = []
+        self.document_frequencies = Counter()
+
+    def add(self, path: str, method: str, details: dict, chunk_file: str):
+        terms = Counter()
+        for field, text in endpoint_fields(path, details).items():
+            for token in tokenize(text):
+                terms[token] += FIELD_WEIGHTS[field]
+        # methods are kept apart from words, "get" being a stop word in a task
+        terms[f"method:{method.lower()}"] += 1
+        # so is the resource the endpoint works on, e.g. "jobs" in /projects/{project_id}/jobs,
+        # which tells /projects apart from the many endpoints nested below it
+        segments = [segment for segment in re.sub(r"{[^}]*}", "", path).split("/") if segment]
+        for token in tokenize(segments[-1].split(":")[0] if segments else ""):
+            terms[f"resource:{token}"] += 1
+        details = details if isinstance(details, dict) else {}
+        self.endpoints.append({
+            "path": path,
+            "method": method.upper(),
+            "summary": details.get("summary") or (details.get("description") or "")[:200],
+            "parameters": [
+                parameter.get("name")
+                for parameter in details.get("parameters") or []
+                if isinstance(parameter, dict)
+            ],
+            "file": chunk_file,
+        })
+        self.term_frequencies.append(dict(terms))
+        self.document_frequencies.update(terms.keys())
+
+    def add_path(self, path: str, methods: dict, chunk_file: str):
+        for method, details in methods.items():
+            if isinstance(details, dict):
+                self.add(path, method, details, chunk_file)
+
+    def search(self, query: str, top_k: int = 5) -> List[dict]:
+        """Returns the `top_k` endpoints scoring highest for `query`, best first."""
+        words = set(tokenize(query))
+        verbs_used = set(re.findall(r"[a-z]+", query.lower()))
+        tokens = words | {f"resource:{word}" for word in words} | {
+            f"method:{method}" for method, verbs in METHOD_VERBS.items() if verbs_used.intersection(verbs)
+        }
+        if not tokens or not self.endpoints:
+            return []
+        lengths = [sum(terms.values()) for terms in self.term_frequencies]
+        average_length = sum(lengths) / len(lengths)
+        count = len(self.endpoints)
+        scores = []
+        for position, terms in enumerate(self.term_frequencies):
+            score = 0.0
+            for token in tokens:
+                frequency = terms.get(token)
+                if not frequency:
+                    continue
+                documents = self.document_frequencies[token]
+                idf = math.log(1 + (count - documents + 0.5) / (documents + 0.5))
+                score += idf * frequency * (self.k1 + 1) / (
+                    frequency + self.k1 * (1 - self.b + self.b * lengths[position] / average_length)
+                )
+            if score > 0:
+                scores.append((score, position))
+        scores.sort(key=lambda item: (-item[0], item[1]))
+        return [
+            {**self.endpoints[position], "score": round(score, 3)}
+            for score, position in scores[:top_k]
+        ]
+
+    def save(self, index_location: str):
+        with open(f"{index_location}.tmp", "w") as f:
+            json.dump(
+                {"endpoints": self.endpoints, "terms": self.term_frequencies},
+                f,
+                separators=(",", ":"),
+            )
+        os.replace(f"{index_location}.tmp", index_location)
+
+    @classmethod
+    def load(cls, index_location: str) -> "EndpointIndex":
+        with open(index_location, "r") as f:
+            stored = json.load(f)
+        index = cls()
+        index.endpoints = stored["endpoints"]
+        index.term_frequencies = stored["terms"]
+        for terms in index.term_frequencies:
+            index.document_frequencies.update(terms.keys())
+        return index
+
+
+def endpoint_index_path(generated_folder_root: str, bucket_folder_name: str) -> str:
+    # not a .json file, the generated root's .json files are the metadata files that get summarised
+    return os.path.join(generated_folder_root, f"{bucket_folder_name}_endpoints.index")
+
+
+_loaded = {}
+
+
+def load_endpoint_index(generated_folder_root: str, swagger_file_name: str):
+    """
+    The endpoint index of an API Specification file, or None if it has not been built.
+    Accepts the spec's file name as well as the name of its metadata file. Indexes are
+    kept in memory until swagger_parser rewrites them.
+    """
+    bucket_folder_name = os.path.basename(swagger_file_name).split(".json")[0]
+    if bucket_folder_name.endswith("_metadata"):
+        bucket_folder_name = bucket_folder_name[: -len("_metadata")]
+    index_location = endpoint_index_path(generated_folder_root, bucket_folder_name)
+    if not os.path.exists(index_location):
+        return None
+    modified = os.path.getmtime(index_location)
+    if index_location not in _loaded or _loaded[index_location][0] != modified:
+        _loaded[index_location] = (modified, EndpointIndex.load(index_location))
+    return _loaded[index_location][1]
@@ -0,0 +1,271 @@
+import asyncio
+from collections import OrderedDict
+from hashlib import sha256
+from json import dumps, loads
+from os import environ
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlparse
+
+from dotenv import dotenv_values, find_dotenv
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from aiagents.custom_threading.cancellation import CancellationToken, current_token
+
+
+def _overlaps(cached_path: str, mutated_path: str) -> bool:
+    # /projects/abc overlaps both /projects (its list) and /projects/abc/jobs (its children)
+    cached, mutated = cached_path.rstrip("/") + "/", mutated_path.rstrip("/") + "/"
+    return cached.startswith(mutated) or mutated.startswith(cached)
+
+
+class ResponseCache:
+    """
+    Short lived cache of successful GET responses, keyed on the path, the query
+    parameters and a hash of the credentials. Fresh entries are served without a
+    request; stale entries with an ETag are revalidated with If-None-Match and
+    served again on a 304. Entries are dropped when a mutating call hits a path
+    that overlaps theirs. `hits`, `misses` and `revalidations` are counted under
+    the cache lock, the cache is shared by concurrent calls.
+    """
+
+    def __init__(self, ttl: float = None, max_entries: int = None) -> None:
+        self.ttl = ttl if ttl is not None else float(environ.get("API_CACHE_TTL_SECONDS", "30"))
+        self.max_entries = max_entries or int(environ.get("API_CACHE_MAX_ENTRIES", "256"))
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def key(path: str, parameters: dict, headers: dict) -> tuple:
+        credentials = sha256(dumps(headers or {}, sort_keys=True).encode()).hexdigest()
+        return path, dumps(parameters or {}, sort_keys=True, default=str), credentials
+
+    def get(self, key):
+        """Returns `(response, fresh)` for a cached key, or `(None, False)`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(key)
+            fresh = monotonic() - entry[0] < self.ttl
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry[1], fresh
+
+    def set(self, key, response: Response):
+        if self.ttl <= 0 or response.status_code != 200:
+            return
+        cache_control = response.headers.get("Cache-Control", "").lower()
+        if "no-store" in cache_control or "private" in cache_control:
+            return
+        with self._lock:
+            self._entries[key] = (monotonic(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def touch(self, key):
+        """Marks the entry of `key` fresh again, after the server confirmed it is unchanged."""
+        with self._lock:
+            self.revalidations += 1
+            if key in self._entries:
+                self._entries[key] = (monotonic(), self._entries[key][1])
+
+    def invalidate(self, path: str):
+        with self._lock:
+            for key in [key for key in self._entries if _overlaps(key[0], path)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _copy_response(response: Response) -> Response:
+    # callers may consume or alter a response, the cached one is handed out as a copy
+    copy = Response()
+    copy.status_code = response.status_code
+    copy.headers = CaseInsensitiveDict(response.headers)
+    copy._content = response.content
+    copy.encoding = response.encoding
+    copy.url = response.url
+    copy.reason = response.reason
+    copy.request = response.request
+    return copy
+
+
+class APIClient:
+    """
+    Keep-alive HTTP client for one target API. Connections are pooled in a
+    requests Session, so consecutive calls reuse the same TCP and TLS connection.
+    """
+
+    methods = ("GET", "POST", "PATCH", "DELETE")
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_connections: int = None,
+        pool_maxsize: int = None,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (
+            connect_timeout or float(environ.get("API_CONNECT_TIMEOUT", "10")),
+            read_timeout or float(environ.get("API_READ_TIMEOUT", "60")),
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections or int(environ.get("API_POOL_CONNECTIONS", "10")),
+            pool_maxsize=pool_maxsize or int(environ.get("API_POOL_MAXSIZE", "10")),
+        )
+        self.session = Session()
+        self.session.verify = False
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.cache = ResponseCache()
+
+    def _send(self, method: str, path: str, parameters: dict, headers: dict):
+        # query parameters for GET, a JSON body for everything else
+        payload = {"params": parameters} if method == "GET" else {"json": parameters}
+        # a cancelled crew thread stops waiting for the response straight away
+        return current_token().run(
+            self.session.request, method, self.base_url + path, headers=headers, timeout=self.timeout, **payload
+        )
+
+    def request(self, method: str, path: str, parameters: dict = None, headers: dict = None):
+        method = method.upper()
+        if method not in self.methods:
+            raise ValueError("Unsupported HTTP method")
+        if method != "GET":
+            response = self._send(method, path, parameters, headers)
+            self.cache.invalidate(path.split("?")[0])
+            return response
+
+        key = self.cache.key(path, parameters, headers)
+        cached, fresh = self.cache.get(key)
+        if fresh:
+            return _copy_response(cached)
+        etag = cached.headers.get("ETag") if cached is not None else None
+        if etag:
+            headers = {**(headers or {}), "If-None-Match": etag}
+        response = self._send(method, path, parameters, headers)
+        if etag and response.status_code == 304:
+            self.cache.touch(key)
+            return _copy_response(cached)
+        self.cache.set(key, response)
+        return _copy_response(response) if response.status_code == 200 else response
+
+    def close(self):
+        self.session.close()
+
+
+def decode_response(response):
+    """JSON body of a response when it has one, the raw text otherwise."""
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
+
+
+async def _call_batch(
+    client: APIClient, calls: List[Dict[str, Any]], headers: dict, max_per_host: int, token: CancellationToken
+):
+    # one semaphore per host caps the calls in flight against the same server
+    semaphores = {}
+
+    async def call(index, details):
+        host = urlparse(client.base_url).netloc
+        semaphore = semaphores.setdefault(host, asyncio.Semaphore(max_per_host))
+        result = {"index": index, "path": details.get("path"), "method": details.get("method")}
+        async with semaphore:
+            if token.cancelled:
+                result.update(status=None, ok=False, error="The call was cancelled before it was sent")
+                return result
+            try:
+                response = await asyncio.to_thread(
+                    client.request, details["method"], details["path"], details.get("parameters") or {}, headers
+                )
+                result.update(status=response.status_code, ok=response.ok, response=decode_response(response))
+            except Exception as e:
+                result.update(status=None, ok=False, error=str(e))
+        return result
+
+    return await asyncio.gather(*(call(index, details) for index, details in enumerate(calls)))
+
+
+def call_batch(base_url: str, calls: List[Dict[str, Any]], headers: dict = None, max_per_host: int = None) -> List[dict]:
+    """
+    Executes a batch of `{"path", "method", "parameters"}` calls against one API
+    concurrently, with at most `max_per_host` (API_MAX_CONCURRENCY_PER_HOST) in
+    flight per host. Results come back in the order of `calls`; a failed call is
+    reported in its own result instead of failing the batch. Calls not yet sent
+    when the crew thread is cancelled are skipped.
+    """
+    max_per_host = max_per_host or int(environ.get("API_MAX_CONCURRENCY_PER_HOST", "8"))
+    client = get_api_client(base_url)
+    token = current_token()
+    return token.run(lambda: asyncio.run(_call_batch(client, calls, headers, max_per_host, token)))
+
+
+_clients: Dict[str, APIClient] = {}
+_targets: Dict[str, Tuple[str, str]] = {}
+_lock = Lock()
+
+
+def get_api_client(base_url: str) -> APIClient:
+    """Returns the pooled client of `base_url`, creating it on first use."""
+    base_url = base_url.rstrip("/")
+    with _lock:
+        if base_url not in _clients:
+            _clients[base_url] = APIClient(base_url)
+        return _clients[base_url]
+
+
+def resolve_api_target(
+    swagger_file: str, endpoints: Dict[str, str] = None, tokens: Dict[str, str] = None
+) -> Tuple[str, str]:
+    """
+    Returns the `(API_ENDPOINT, API_BEARER_TOKEN)` of an API Specification file: those
+    in `endpoints` and `tokens`, as entered in the session, or else those configured in
+    .env. A target found in .env is kept until `invalidate_api_targets`; a file with no
+    endpoint is looked up again next time and raises a ValueError.
+    """
+    endpoints, tokens = endpoints or {}, tokens or {}
+    if swagger_file in endpoints:
+        return endpoints[swagger_file], tokens.get(swagger_file)
+    with _lock:
+        target = _targets.get(swagger_file)
+        if target is None:
+            # read without loading it into the environment, which every session shares
+            settings = {**environ, **dotenv_values(find_dotenv())}
+            configured_endpoints = loads((settings.get("API_ENDPOINT") or "{}").replace("'", '"'))
+            configured_tokens = loads((settings.get("API_BEARER_TOKEN") or "{}").replace("'", '"'))
+            if not configured_endpoints.get(swagger_file):
+                raise ValueError(
+                    f"No API Endpoint is configured for the API Specification file {swagger_file!r}, "
+                    "enter it with the file or update it with the update_env_variables tool."
+                )
+            target = _targets[swagger_file] = (configured_endpoints[swagger_file], configured_tokens.get(swagger_file))
+    endpoint, token = target
+    return endpoint, tokens.get(swagger_file, token)
+
+
+def invalidate_api_targets():
+    """
+    Forgets the cached endpoints and tokens, to be called whenever they change.
+    Cached responses are dropped as well, as they may belong to the previous credentials.
+    """
+    with _lock:
+        _targets.clear()
+        for client in _clients.values():
+            client.cache.clear()
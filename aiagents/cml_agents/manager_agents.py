@@ -8,7 +8,12 @@ from .tools import (
     metadata_summary_fetcher,
     get_human_input,
     api_caller,
-    update_env_variables
+    api_batch_caller,
+    api_response_query,
+    update_env_variables,
+    definition_fetcher,
+    endpoint_search,
+    summary_search,
 )
 
 
@@ -20,7 +25,8 @@ class ManagerAgents:
         self.task_matching_agent = Agent(
             role="Input Matcher",
             goal="""Match the tasks to the best matching API based on the metadata summaries."""
-            """ Fetch the metadata summary using the metadata_summary_fetcher tool. If there"""
+            """ Search the metadata summaries closest to the task using the summary_search tool, and only fetch"""
+            """ the whole metadata summary using the metadata_summary_fetcher tool if the search is not conclusive. If there"""
             """ is no metadata summary available, make sure that you return a meesage to the user with appropriate message that"""
             """none of API signatures are available and ask the user :- Please use ADMIN API to upload an OPEN API spec file."""
             """ Once metadata file is present, figure out which swagger metadata file is best"""
@@ -29,7 +35,7 @@ class ManagerAgents:
             backstory="You are an expert in matching tasks to APIs.",
             verbose=True,
             allow_delegation=True,
-            tools=[metadata_summary_fetcher, get_human_input],
+            tools=[summary_search, metadata_summary_fetcher, get_human_input],
             llm=configuration.llm,
             callbacks=configuration.customInteractionCallbacks,
             step_callback=custom_agent_callback,
@@ -46,8 +52,9 @@ class ManagerAgents:
                 Think through this decision carefully and make sure to provide a justification as to why you chose the
                 that particular endpoint and method.
 
-                For any query that comes your way, first read the metadata file, then and only then based on the metadata decide 
-                on which endpoint suites the best. Use 'Decision Validator Agent' to validate the endpoints chosen. 
+                For any query that comes your way, first search the endpoints of the metadata file using the endpoint_search tool, 
+                then and only then based on the candidates decide on which endpoint suites the best. Only read the whole metadata 
+                file if none of the candidates fit. Use 'Decision Validator Agent' to validate the endpoints chosen. 
                 Once you have decided on the endpoint and method to use, using the human input tool ask the user to provide 
                 details about the parameters they would like to set while making the call. Make no assumptions here. 
                 Make sure to clarify any doubts a user might have about the API call.
@@ -75,7 +82,7 @@ class ManagerAgents:
                 """
             ),
             verbose=True,
-            tools=[FileReadTool(), generated_directory_lister, api_caller, get_human_input, update_env_variables],
+            tools=[FileReadTool(), endpoint_search, generated_directory_lister, definition_fetcher, api_caller, api_batch_caller, api_response_query, get_human_input, update_env_variables],
             llm=configuration.llm,
             allow_delegation=True,
             callbacks=configuration.customInteractionCallbacks,
@@ -0,0 +1,121 @@
+from os import environ
+from typing import Callable, Iterator, Optional
+
+from .response_shaping import response_schema
+
+# Query parameter and response field names used by paginated list endpoints,
+# CML's own (page_size / page_token / next_page_token) first.
+PAGE_SIZE_PARAMETERS = ("page_size", "pageSize", "limit", "per_page")
+PAGE_TOKEN_PARAMETERS = ("page_token", "pageToken", "next_page_token", "cursor")
+NEXT_PAGE_TOKEN_FIELDS = ("next_page_token", "nextPageToken", "next_cursor", "nextCursor")
+
+MAX_PAGES = int(environ.get("API_MAX_PAGES", "20"))
+MAX_RESPONSE_BYTES = int(float(environ.get("API_MAX_RESPONSE_MB", "2")) * 1024 * 1024)
+
+
+def pagination_parameters(operation: Optional[dict]) -> Optional[dict]:
+    """
+    Detects whether an operation of a path chunk is paginated. Returns the names of
+    its page size and page token query parameters and of the next page token field
+    of its response, or None for operations that are not paginated.
+    """
+    if not isinstance(operation, dict):
+        return None
+    query = {
+        parameter.get("name")
+        for parameter in operation.get("parameters") or []
+        if isinstance(parameter, dict) and parameter.get("in") == "query"
+    }
+    token_parameter = next((name for name in PAGE_TOKEN_PARAMETERS if name in query), None)
+    if token_parameter is None:
+        return None
+    properties = (response_schema(operation) or {}).get("properties") or {}
+    return {
+        "size": next((name for name in PAGE_SIZE_PARAMETERS if name in query), None),
+        "token": token_parameter,
+        # a schema kept behind a shared "$ref" has no properties to look at,
+        # the usual field names are then tried on the responses themselves
+        "next_token": next((name for name in NEXT_PAGE_TOKEN_FIELDS if name in properties), None),
+    }
+
+
+def next_page_token(page: dict, paging: dict):
+    fields = [paging["next_token"]] if paging.get("next_token") else NEXT_PAGE_TOKEN_FIELDS
+    return next((page[field] for field in fields if page.get(field)), None)
+
+
+def iter_pages(fetch: Callable[[dict], object], parameters: dict, paging: dict, max_pages: int = None) -> Iterator:
+    """
+    Yields the responses of consecutive pages, fetched lazily with `fetch(parameters)`.
+    Stops at the last page, at the first failed response or after `max_pages` pages.
+    """
+    max_pages = max_pages or MAX_PAGES
+    parameters = dict(parameters)
+    seen_tokens = set()
+    for _ in range(max_pages):
+        response = fetch(parameters)
+        yield response
+        if not response.ok:
+            return
+        try:
+            token = next_page_token(response.json(), paging)
+        except (ValueError, AttributeError):
+            return
+        # a server handing back a token twice would otherwise page forever
+        if not token or token in seen_tokens:
+            return
+        seen_tokens.add(token)
+        parameters[paging["token"]] = token
+
+
+def _items_field(page: dict, paging: dict):
+    return next(
+        (key for key, value in page.items() if isinstance(value, list) and key != paging.get("next_token")),
+        None,
+    )
+
+
+def collect_pages(pages: Iterator, paging: dict, max_pages: int = None, max_bytes: int = None) -> dict:
+    """
+    Aggregates the pages of a list endpoint into a single compact response holding
+    the items of every page. Reading stops once `max_pages` pages or `max_bytes`
+    bytes have been received; the response then says so and carries the token to
+    resume from.
+    """
+    max_pages = max_pages or MAX_PAGES
+    max_bytes = max_bytes or MAX_RESPONSE_BYTES
+    aggregate = {"items": [], "pages": 0, "bytes": 0, "complete": False}
+    token = None
+    for response in pages:
+        if not response.ok:
+            aggregate["error"] = {"status": response.status_code, "response": response.text}
+            break
+        page = response.json()
+        aggregate["pages"] += 1
+        aggregate["bytes"] += len(response.content)
+        field = _items_field(page, paging) if isinstance(page, dict) else None
+        if field is None:
+            # not a list response after all, hand it over as it is
+            return page if aggregate["pages"] == 1 else aggregate
+        aggregate["items_field"] = field
+        aggregate["items"].extend(page[field])
+        token = next_page_token(page, paging)
+        if not token:
+            aggregate["complete"] = True
+            break
+        if aggregate["bytes"] >= max_bytes or aggregate["pages"] >= max_pages:
+            break
+    aggregate["count"] = len(aggregate["items"])
+    if not aggregate["complete"] and "error" not in aggregate:
+        aggregate["next_page_token"] = token
+        aggregate["note"] = (
+            f"Stopped after {aggregate['pages']} pages and {aggregate['bytes']} bytes, pass "
+            f"'{paging['token']}' with the next_page_token to continue."
+        )
+    return aggregate
+
+
+def aggregate_schema(page_schema: Optional[dict], aggregate: dict) -> dict:
+    """Schema of an aggregate built by `collect_pages`, from the schema of a single page."""
+    items = ((page_schema or {}).get("properties") or {}).get(aggregate.get("items_field"))
+    return {"properties": {**{key: {} for key in aggregate}, "items": items or {}}}
@@ -1,10 +1,41 @@
 import os
+import re
 import json
+import warnings
 import yaml
+import ijson
 import jsonref
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from urllib.parse import unquote
+
+from hashlib import sha256
+
+from .spec_serializer import SpecSerializer, dump_spec
+from .endpoint_index import EndpointIndex, endpoint_index_path
+
+# Top-level sections that local "$ref"s point into. Only these are kept in memory
+# while streaming, every path item is dereferenced against them on its own.
+REFERENCE_SECTIONS = ("components", "definitions", "parameters", "responses")
+
+# Specs larger than this are split in streaming mode unless told otherwise.
+STREAMING_THRESHOLD_MB = float(os.environ.get("SWAGGER_STREAMING_THRESHOLD_MB", "20"))
+
+# Schemas behind these pointers are written once to the definitions store of a bucket
+# instead of being inlined into every chunk when shared definitions are enabled.
+SHARED_REF_PREFIXES = ("#/components/schemas/", "#/definitions/")
+SHARED_DEFINITIONS = os.environ.get("SWAGGER_SHARED_DEFINITIONS", "False").lower() == "true"
+DEFINITIONS_FOLDER_NAME = "definitions"
+
+# Number of processes used to write chunks, 1 keeps everything on the calling thread.
+PARSER_WORKERS = int(os.environ.get("SWAGGER_PARSER_WORKERS", "1"))
 
 class CustomJSONEncoder(json.JSONEncoder):
-    """Custom JSON encoder to handle circular references."""
+    """
+    Custom JSON encoder to handle circular references.
+    Superseded by `SpecSerializer`, kept as the baseline for benchmarks/serializer_benchmark.py.
+    """
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.seen = set()
@@ -42,6 +73,261 @@ def read_swagger_file(swagger_file_location):
     else:
         raise ValueError(f"Unsupported file format: {swagger_file_location}")
 
+def _iter_json_sections(file, sections):
+    """
+    Incrementally parses a JSON document and yields `(section, key, value)` for the
+    requested top-level sections. The "paths" section is yielded one path item at a
+    time, any other section is yielded whole with `key` set to None.
+    """
+    depth = 0
+    section = key = None
+    builder = None
+    builder_depth = 0
+    for event, value in ijson.basic_parse(file, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if event in ("start_map", "start_array"):
+                builder_depth += 1
+            elif event in ("end_map", "end_array"):
+                builder_depth -= 1
+            if builder_depth == 0:
+                yield section, key, builder.value
+                builder = None
+            continue
+
+        if event == "map_key":
+            if depth == 1:
+                section, key = value, None
+            elif depth == 2 and section == "paths":
+                key = value
+            continue
+        if event in ("end_map", "end_array"):
+            depth -= 1
+            continue
+
+        if section in sections and depth == (2 if section == "paths" else 1):
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            if event in ("start_map", "start_array"):
+                builder_depth = 1
+            else:
+                yield section, key, builder.value
+                builder = None
+        elif event in ("start_map", "start_array"):
+            depth += 1
+
+
+def _load_yaml_events(events):
+    """Loads a single YAML node from the list of parser events describing it."""
+    return yaml.safe_load(yaml.emit(
+        [yaml.StreamStartEvent(), yaml.DocumentStartEvent(), *events,
+         yaml.DocumentEndEvent(), yaml.StreamEndEvent()]
+    ))
+
+
+def _iter_yaml_sections(file, sections):
+    """
+    Incrementally parses a YAML document and yields the same `(section, key, value)`
+    tuples as `_iter_json_sections`. Every kept node is loaded on its own, so anchors
+    must not be shared across path items.
+    """
+    # one [is_mapping, next_node_is_key] entry per open collection
+    stack = []
+    section = key = None
+    collected = None
+    collected_depth = 0
+    for event in yaml.parse(file, Loader=yaml.SafeLoader):
+        if isinstance(event, (yaml.StreamStartEvent, yaml.StreamEndEvent,
+                              yaml.DocumentStartEvent, yaml.DocumentEndEvent)):
+            continue
+
+        if collected is not None:
+            collected.append(event)
+            if isinstance(event, yaml.CollectionStartEvent):
+                collected_depth += 1
+            elif isinstance(event, yaml.CollectionEndEvent):
+                collected_depth -= 1
+            if collected_depth == 0:
+                yield section, key, _load_yaml_events(collected)
+                collected = None
+            continue
+
+        if isinstance(event, yaml.CollectionEndEvent):
+            stack.pop()
+            continue
+
+        depth = len(stack)
+        is_key = bool(stack) and stack[-1][0] and stack[-1][1]
+        if stack and stack[-1][0]:
+            stack[-1][1] = not stack[-1][1]
+
+        if is_key and isinstance(event, yaml.ScalarEvent):
+            if depth == 1:
+                section, key = event.value, None
+            elif depth == 2 and section == "paths":
+                key = event.value
+            continue
+
+        if not is_key and section in sections and depth == (2 if section == "paths" else 1):
+            collected = [event]
+            if isinstance(event, yaml.CollectionStartEvent):
+                collected_depth = 1
+            else:
+                yield section, key, _load_yaml_events(collected)
+                collected = None
+        elif isinstance(event, yaml.CollectionStartEvent):
+            stack.append([isinstance(event, yaml.MappingStartEvent), True])
+
+
+def iter_swagger_sections(swagger_file_location, sections):
+    """
+    Streams the given top-level sections out of a Swagger file in JSON or YAML
+    format without loading the whole document.
+
+    :param swagger_file_location: The path to the Swagger file
+    :param sections: Names of the top-level sections to yield
+    :return: Generator of `(section, key, value)` tuples
+    """
+    if swagger_file_location.endswith('.json'):
+        with open(swagger_file_location, 'rb') as file:
+            yield from _iter_json_sections(file, sections)
+    elif swagger_file_location.endswith('.yaml') or swagger_file_location.endswith('.yml'):
+        with open(swagger_file_location, 'r') as file:
+            yield from _iter_yaml_sections(file, sections)
+    else:
+        raise ValueError(f"Unsupported file format: {swagger_file_location}")
+
+
+def _resolve_pointer(document, ref):
+    """Returns the node a local JSON pointer such as '#/components/schemas/Project' points to."""
+    node = document
+    for token in ref[2:].split("/"):
+        token = unquote(token).replace("~1", "/").replace("~0", "~")
+        if isinstance(node, dict) and token in node:
+            node = node[token]
+        elif isinstance(node, list) and token.isdigit() and int(token) < len(node):
+            node = node[int(token)]
+        else:
+            return None
+    return node
+
+
+def resolve_refs(node, document, shared=None, unresolved=None, _stack=()):
+    """
+    Inlines the local "$ref"s found in `node` using the definitions in `document`,
+    merging sibling keys into the resolved object like jsonref's `merge_props`.
+    A reference that is already being expanded further up is left in place as a
+    `{"$ref": ...}` back-pointer, so circular schemas terminate.
+
+    When a `shared` set is passed, references to shared schemas (SHARED_REF_PREFIXES)
+    are kept as they are and collected into it instead of being inlined.
+    References whose target is not in `document` are left in place, and collected
+    into the `unresolved` set when one is passed.
+    """
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if isinstance(ref, str) and ref.startswith("#/"):
+            if shared is not None and ref.startswith(SHARED_REF_PREFIXES):
+                shared.add(ref)
+                return {k: resolve_refs(v, document, shared, unresolved, _stack) for k, v in node.items()}
+            if ref in _stack:
+                return {"$ref": ref}
+            target = _resolve_pointer(document, ref)
+            if target is None:
+                if unresolved is not None:
+                    unresolved.add(ref)
+                return node
+            resolved = resolve_refs(target, document, shared, unresolved, _stack + (ref,))
+            siblings = {k: resolve_refs(v, document, shared, unresolved, _stack) for k, v in node.items() if k != "$ref"}
+            if siblings and isinstance(resolved, dict):
+                return {**resolved, **siblings}
+            return resolved
+        return {k: resolve_refs(v, document, shared, unresolved, _stack) for k, v in node.items()}
+    if isinstance(node, list):
+        return [resolve_refs(element, document, shared, unresolved, _stack) for element in node]
+    return node
+
+
+def read_swagger_references(swagger_file_location):
+    """Streams only the sections "$ref"s point into out of a Swagger file."""
+    return {
+        section: value
+        for section, _, value in iter_swagger_sections(swagger_file_location, REFERENCE_SECTIONS)
+    }
+
+
+def iter_swagger_paths(swagger_file_location, references=None, shared=None):
+    """
+    Yields `(path, methods)` for every path of a Swagger file with its "$ref"s
+    resolved, holding only the reference sections and one path item in memory.
+
+    Only the reference sections are at hand, so references into the paths
+    themselves ("#/paths/...") are not resolved in streaming mode, unlike with
+    jsonref. They are left in place as "$ref"s and a warning names each of them.
+    """
+    if references is None:
+        references = read_swagger_references(swagger_file_location)
+    for _, path, methods in iter_swagger_sections(swagger_file_location, ("paths",)):
+        unresolved = set()
+        methods = resolve_refs(methods, references, shared, unresolved)
+        for ref in sorted(unresolved):
+            warnings.warn(
+                f"The reference {ref} of the path {path} in {swagger_file_location} "
+                "is left unresolved, streaming mode only resolves references into "
+                f"the {', '.join(REFERENCE_SECTIONS)} sections",
+                stacklevel=2,
+            )
+        yield path, methods
+
+
+def document_references(document):
+    """
+    The sections "$ref"s point into of an already parsed Swagger document. The
+    paths are in memory as well here, so references into them are resolved too.
+    """
+    return {section: document[section] for section in REFERENCE_SECTIONS + ("paths",) if section in document}
+
+
+def iter_document_paths(document, references=None, shared=None):
+    """
+    Yields `(path, methods)` for every path of an already parsed Swagger document
+    with its "$ref"s resolved, one path item at a time.
+    """
+    if references is None:
+        references = document_references(document)
+    for path, methods in document.get("paths", {}).items():
+        yield path, resolve_refs(methods, references, shared)
+
+
+def definition_file_name(ref):
+    """Maps a shared "$ref" such as '#/components/schemas/Project' to its file name in the definitions store."""
+    return sanitize_file_name(ref.lstrip("#/")) + ".json"
+
+
+def write_definitions(shared, references, output_dir):
+    """
+    Writes every shared definition referenced by the chunks, and the ones they
+    reference in turn, once into the definitions store under `output_dir`.
+    Returns the number of definitions written.
+    """
+    definitions_dir = os.path.join(output_dir, DEFINITIONS_FOLDER_NAME)
+    os.makedirs(definitions_dir, exist_ok=True)
+
+    written = set()
+    pending = list(shared)
+    while pending:
+        ref = pending.pop()
+        if ref in written:
+            continue
+        written.add(ref)
+        nested = set()
+        definition = resolve_refs(_resolve_pointer(references, ref), references, nested)
+        with open(os.path.join(definitions_dir, definition_file_name(ref)), 'w') as file:
+            dump_spec({"$id": ref, "definition": definition}, file, indent=2)
+        pending.extend(nested - written)
+    return len(written)
+
+
 def split_swagger_by_paths(swagger_data):
     """Split the Swagger file into chunks based on the API paths."""
     chunks = {}
@@ -59,57 +345,280 @@ def sanitize_file_name(name):
     """Sanitize the file name by replacing invalid characters."""
     return name.replace('/', '_').replace('\\', '_')
 
-def swagger_parser(swagger_file_name: str, swagger_file_root: str, generated_folder_root: str):
+def content_hash(content):
+    """Returns the SHA-256 hex digest of a str or bytes value."""
+    return sha256(content.encode() if isinstance(content, str) else content).hexdigest()
+
+def file_hash(file_location):
+    """Returns the SHA-256 hex digest of a file, read in blocks."""
+    digest = sha256()
+    with open(file_location, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def manifest_file_path(generated_folder_root, bucket_folder_name):
+    """Location of the manifest kept next to `{bucket}_metadata.json`."""
+    return os.path.join(generated_folder_root, f"{bucket_folder_name}_metadata.manifest")
+
+def read_manifest(manifest_location):
+    """Reads a manifest file, returning an empty manifest if it is missing or unreadable."""
+    try:
+        with open(manifest_location, 'r') as file:
+            return json.load(file)
+    except (IOError, ValueError):
+        return {"source": None, "paths": {}}
+
+_metadata_cache = {}
+
+def _read_metadata(metadata_file_path):
+    # the metadata of a bucket is re-read only when swagger_parser rewrites it
+    modified = os.path.getmtime(metadata_file_path)
+    cached = _metadata_cache.get(metadata_file_path)
+    if cached is None or cached[0] != modified:
+        with open(metadata_file_path, 'r') as f:
+            metadata = json.load(f)
+        templates = [
+            (re.compile("^" + re.sub(r"\\\{[^/]*?\\\}", "[^/]+", re.escape(path)) + "$"), path)
+            for path in metadata
+        ]
+        cached = _metadata_cache[metadata_file_path] = (modified, metadata, templates)
+    return cached[1], cached[2]
+
+def find_path_operation(generated_folder_root, swagger_file_name, path, method):
+    """
+    Looks up the operation of `method` on `path` in the chunks of an API Specification
+    file. `path` may be a concrete URL path such as /api/v2/projects/abc, which is
+    matched against the templated paths of the spec. Returns the chunk file and the
+    operation, or `(None, None)` when the spec has no such operation.
+    """
+    bucket_folder_name = swagger_file_name.split(".json")[0]
+    metadata_file_path = os.path.join(generated_folder_root, f"{bucket_folder_name}_metadata.json")
+    if not swagger_file_name or not os.path.exists(metadata_file_path):
+        return None, None
+    metadata, templates = _read_metadata(metadata_file_path)
+    path = path.split("?")[0]
+    template = path if path in metadata else next(
+        (template for pattern, template in templates if pattern.match(path)), None
+    )
+    if template is None or not os.path.exists(metadata[template]["file"]):
+        return None, None
+    with open(metadata[template]["file"], 'r') as f:
+        chunk = json.load(f)
+    return metadata[template]["file"], chunk["methods"].get(method.lower())
+
+def write_chunk(path, methods, output_dir, previous_hash=None):
+    """
+    Writes a single path chunk into `output_dir` and returns the metadata entry
+    mapping the path to its chunk file, together with the hash of the chunk.
+    The file is left untouched when its content still matches `previous_hash`.
+    """
+    sanitized_key = sanitize_file_name(path)
+    chunk_file_name = os.path.join(output_dir, f"{sanitized_key}.json")
+
+    chunk_hash = None
+    try:
+        encoded = SpecSerializer(indent=2).encode({"path": path, "methods": methods})
+        chunk_hash = content_hash(encoded)
+        if chunk_hash != previous_hash or not os.path.exists(chunk_file_name):
+            with open(chunk_file_name, 'w') as file:
+                file.write(encoded)
+    except Exception as e:
+        print(f"Error loading API Specification file chunk: {e}")
+
+    # Populate the metadata for mapping paths to chunk files
+    methods_metadata = {}
+    for method, details in methods.items():
+        if isinstance(details, dict):  # Check if details is a dictionary
+            # Attempt to get a summary, falling back to description if not available
+            summary = details.get("summary") or details.get("description", "")
+        else:
+            summary = ""  # If details is not a dictionary, set summary to empty
+
+        methods_metadata[method] = summary
+
+    return {
+        "methods": methods_metadata,
+        "file": chunk_file_name
+    }, chunk_hash
+
+def _timed(iterable, timings, stage):
+    """Passes `iterable` through, adding the time spent producing each item to `timings[stage]`."""
+    iterator = iter(iterable)
+    while True:
+        start = perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            timings[stage] += perf_counter() - start
+            return
+        timings[stage] += perf_counter() - start
+        yield item
+
+def _indexed(path_items, index, output_dir):
+    """Passes `(path, methods)` items through, adding their operations to the endpoint index."""
+    for path, methods in path_items:
+        index.add_path(path, methods, os.path.join(output_dir, f"{sanitize_file_name(path)}.json"))
+        yield path, methods
+
+def _write_chunks_parallel(path_items, output_dir, workers, previous_hashes):
+    """
+    Writes chunks in a process pool and yields `(path, (metadata entry, hash))` in the
+    order the paths were read. At most a few chunks per worker are in flight at once,
+    so streamed specs are not pulled into memory ahead of the writers.
+    """
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for path, methods in path_items:
+            in_flight.append((path, executor.submit(
+                write_chunk, path, methods, output_dir, previous_hashes.get(path)
+            )))
+            if len(in_flight) >= workers * 4:
+                path, future = in_flight.popleft()
+                yield path, future.result()
+        while in_flight:
+            path, future = in_flight.popleft()
+            yield path, future.result()
+
+def swagger_parser(swagger_file_name: str, swagger_file_root: str, generated_folder_root: str, streaming: bool = None, workers: int = None, shared_definitions: bool = None, document: dict = None, source_hash: str = None):
     """
     Processes a single Swagger file, splits it into individual files based on paths,
     and stores them in a specified directory structure.
-    This version is optimized for large Swagger files.
+
+    In streaming mode the file is parsed incrementally and each path is dereferenced
+    and written as soon as it is read, so peak memory follows the largest path item
+    instead of the whole document. When `streaming` is None it is enabled for files
+    bigger than SWAGGER_STREAMING_THRESHOLD_MB.
+
+    With more than one worker (SWAGGER_PARSER_WORKERS by default) chunk serialisation
+    and metadata extraction run in a process pool, while the metadata file keeps the
+    order of the paths in the spec. Returns the time spent in each stage, in seconds.
+
+    With shared definitions (SWAGGER_SHARED_DEFINITIONS by default) component schemas
+    are not inlined. Chunks keep their "$ref"s and each schema is written once to
+    `<bucket>/definitions/`, where the definition_fetcher tool resolves it on demand.
+
+    Every operation is also added to a BM25 endpoint index kept next to the metadata
+    file, which the endpoint_search tool queries with the task at hand.
+
+    Re-uploads are incremental: a manifest with the hash of the source file and of
+    every chunk is kept next to the metadata file. An unchanged spec is skipped
+    entirely, otherwise only changed or added chunks are rewritten and the chunks
+    of removed paths are deleted.
+
+    A `document` already parsed from the file, e.g. while it was uploaded, is used
+    instead of reading the file again, unless the file is streamed. Its `source_hash`
+    spares hashing the file.
     """
+    timings = {"parse": 0.0, "write": 0.0, "metadata": 0.0}
+    workers = workers or PARSER_WORKERS
+    if shared_definitions is None:
+        shared_definitions = SHARED_DEFINITIONS
+
     # Define the path to the swagger file and the output folder for chunks
     swagger_file_location = os.path.join(swagger_file_root, swagger_file_name)
     bucket_folder_name = swagger_file_name.split(".json")[0]
 
-    # Read the Swagger file using the new read function
-    swagger_data = read_swagger_file(swagger_file_location)
+    metadata_file_path = os.path.join(generated_folder_root, f"{bucket_folder_name}_metadata.json")
+    manifest_location = manifest_file_path(generated_folder_root, bucket_folder_name)
+    index_location = endpoint_index_path(generated_folder_root, bucket_folder_name)
+    manifest = read_manifest(manifest_location)
+    source_hash = source_hash or file_hash(swagger_file_location)
+    if manifest["source"] == source_hash and os.path.exists(metadata_file_path) and os.path.exists(index_location):
+        print(f"API Specification file {swagger_file_name} is unchanged, skipping the split.")
+        return timings
+
+    if streaming is None:
+        streaming = os.path.getsize(swagger_file_location) > STREAMING_THRESHOLD_MB * 1024 * 1024
+
+    shared = set() if shared_definitions else None
+    if document is not None and not streaming:
+        references = document_references(document)
+        path_items = _timed(iter_document_paths(document, references, shared), timings, "parse")
+    elif shared_definitions:
+        # the raw document is needed to keep "$ref"s, which the streaming reader provides
+        streaming = True
+        start = perf_counter()
+        references = read_swagger_references(swagger_file_location)
+        timings["parse"] += perf_counter() - start
+        path_items = _timed(iter_swagger_paths(swagger_file_location, references, shared), timings, "parse")
+    elif streaming:
+        path_items = _timed(iter_swagger_paths(swagger_file_location), timings, "parse")
+    else:
+        # Read the Swagger file using the new read function
+        start = perf_counter()
+        swagger_data = read_swagger_file(swagger_file_location)
+        path_items = [
+            (path, chunk["methods"]) for path, chunk in split_swagger_by_paths(swagger_data).items()
+        ]
+        timings["parse"] += perf_counter() - start
 
     # Create the output directory for the Swagger file chunks
     output_dir = os.path.join(generated_folder_root, bucket_folder_name)
     os.makedirs(output_dir, exist_ok=True)
 
+    # Operations are added to the endpoint search index as they pass by
+    index = EndpointIndex()
+    path_items = _indexed(path_items, index, output_dir)
+
     # Initialize metadata to map paths to files
     metadata = {}
-
-    chunks = split_swagger_by_paths(swagger_data)
+    previous_hashes = {path: entry["hash"] for path, entry in manifest["paths"].items()}
+    chunk_hashes = {}
 
     # Write each path chunk into the respective JSON file in the correct folder
-    for path, chunk in chunks.items():
-        sanitized_key = sanitize_file_name(path)
-        chunk_file_name = os.path.join(output_dir, f"{sanitized_key}.json")
-        
-        try:
-            with open(chunk_file_name, 'w') as file:
-                json.dump(chunk, file, cls=CustomJSONEncoder, indent=2)
-        except Exception as e:
-            print(f"Error loading API Specification file chunk: {e}")
-
-        # Populate the metadata for mapping paths to chunk files
-        methods_metadata = {}
-        for method, details in chunk["methods"].items():
-            if isinstance(details, dict):  # Check if details is a dictionary
-                # Attempt to get a summary, falling back to description if not available
-                summary = details.get("summary") or details.get("description", "")
-            else:
-                summary = ""  # If details is not a dictionary, set summary to empty
-            
-            methods_metadata[method] = summary
+    start = perf_counter()
+    parsed = timings["parse"]
+    if workers > 1:
+        written_chunks = _write_chunks_parallel(path_items, output_dir, workers, previous_hashes)
+    else:
+        written_chunks = (
+            (path, write_chunk(path, methods, output_dir, previous_hashes.get(path)))
+            for path, methods in path_items
+        )
+    for path, (entry, chunk_hash) in written_chunks:
+        metadata[path] = entry
+        chunk_hashes[path] = chunk_hash
+    # parsing is interleaved with writing when streaming
+    timings["write"] = perf_counter() - start - (timings["parse"] - parsed)
 
-        metadata[path] = {
-            "methods": methods_metadata,
-            "file": chunk_file_name
-        }
+    # Drop the chunks of paths that are no longer part of the spec
+    current_files = {entry["file"] for entry in metadata.values()}
+    removed = [path for path in manifest["paths"] if path not in metadata]
+    for path in removed:
+        chunk_file_name = manifest["paths"][path]["file"]
+        if chunk_file_name not in current_files and os.path.exists(chunk_file_name):
+            os.remove(chunk_file_name)
+    changed = sum(1 for path, chunk_hash in chunk_hashes.items() if previous_hashes.get(path) != chunk_hash)
+
+    if shared_definitions:
+        start = perf_counter()
+        written = write_definitions(shared, references, output_dir)
+        timings["definitions"] = perf_counter() - start
+        print(f"Written {written} shared definitions to: {os.path.join(output_dir, DEFINITIONS_FOLDER_NAME)}")
 
     # Write the metadata after processing all paths
-    metadata_file_path = os.path.join(generated_folder_root, f"{bucket_folder_name}_metadata.json")
+    start = perf_counter()
     with open(metadata_file_path, 'w') as f:
-        json.dump(metadata, f, cls=CustomJSONEncoder, separators=(",", ":"))
+        dump_spec(metadata, f, separators=(",", ":"))
+    with open(manifest_location, 'w') as f:
+        json.dump({
+            "source": source_hash,
+            "metadata": file_hash(metadata_file_path),
+            "paths": {
+                path: {"hash": chunk_hashes[path], "file": entry["file"]}
+                for path, entry in metadata.items()
+            },
+        }, f, separators=(",", ":"))
+    timings["metadata"] = perf_counter() - start
     print(f"Written metadata to: {metadata_file_path}")
+
+    start = perf_counter()
+    index.save(index_location)
+    timings["index"] = perf_counter() - start
+    print(f"Indexed {len(index.endpoints)} endpoints in: {index_location}")
+    print(
+        f"Split {len(metadata)} paths ({changed} changed or added, {len(removed)} removed) with {workers} worker(s): "
+        + ", ".join(f"{stage} {elapsed:.2f}s" for stage, elapsed in timings.items())
+    )
+    return timings
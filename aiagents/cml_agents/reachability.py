@@ -0,0 +1,116 @@
+from os import environ
+from threading import Lock, Timer
+from time import monotonic
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from aiagents.custom_threading.cancellation import CancellationToken, CrewCancelled
+
+
+def probe_endpoint(url: str, timeout: float) -> Tuple[bool, str]:
+    """Checks whether the API endpoint `url` answers at all, returns whether it does and why not."""
+    from requests import head, exceptions
+
+    try:
+        response = head(url, timeout=timeout, verify=False)
+        return True, str(response.status_code)
+    except exceptions.RequestException as e:
+        return False, str(e)
+
+
+def _host(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}".lower()
+
+
+class ReachabilityCache:
+    """
+    Recent reachability results per host. A reachable host is trusted for `ttl`
+    seconds (ENDPOINT_CHECK_TTL_SECONDS), an unreachable one is retried after
+    `failure_ttl` (ENDPOINT_CHECK_FAILURE_TTL_SECONDS), the network may have been fixed.
+    """
+
+    def __init__(self, ttl: float = None, failure_ttl: float = None) -> None:
+        self.ttl = ttl if ttl is not None else float(environ.get("ENDPOINT_CHECK_TTL_SECONDS", "60"))
+        self.failure_ttl = (
+            failure_ttl if failure_ttl is not None else float(environ.get("ENDPOINT_CHECK_FAILURE_TTL_SECONDS", "10"))
+        )
+        self._results: Dict[str, Tuple[bool, str, float]] = {}
+        self._lock = Lock()
+
+    def get(self, url: str) -> Optional[Tuple[bool, str]]:
+        with self._lock:
+            result = self._results.get(_host(url))
+        if result is None:
+            return None
+        reachable, detail, checked = result
+        if monotonic() - checked > (self.ttl if reachable else self.failure_ttl):
+            return None
+        return reachable, detail
+
+    def set(self, url: str, reachable: bool, detail: str):
+        with self._lock:
+            self._results[_host(url)] = (reachable, detail, monotonic())
+
+
+reachability_cache = ReachabilityCache()
+
+
+class ReachabilityChecker:
+    """
+    Checks the reachability of the URL typed into one input, off the UI thread.
+    A check starts once the input has been left alone for `debounce` seconds
+    (ENDPOINT_CHECK_DEBOUNCE_MS); a newer URL cancels the pending or running check
+    of the previous one, whose result is never reported. Hosts checked recently
+    are answered from the cache right away. `on_result(url, reachable, detail)` is
+    called on the checking thread.
+    """
+
+    def __init__(
+        self,
+        on_result: Callable[[str, bool, str], None],
+        debounce: float = None,
+        timeout: float = None,
+        cache: ReachabilityCache = reachability_cache,
+        probe: Callable[[str, float], Tuple[bool, str]] = probe_endpoint,
+    ) -> None:
+        self.on_result = on_result
+        self.debounce = debounce if debounce is not None else float(environ.get("ENDPOINT_CHECK_DEBOUNCE_MS", "400")) / 1000
+        self.timeout = timeout or float(environ.get("ENDPOINT_CHECK_TIMEOUT", "10"))
+        self.cache = cache
+        self.probe = probe
+        self._timer: Optional[Timer] = None
+        self._token: Optional[CancellationToken] = None
+        self._lock = Lock()
+
+    def request(self, url: str):
+        self.cancel()
+        cached = self.cache.get(url)
+        if cached is not None:
+            self.on_result(url, *cached)
+            return
+        token = CancellationToken()
+        timer = Timer(self.debounce, self._check, (url, token))
+        timer.daemon = True
+        with self._lock:
+            self._timer, self._token = timer, token
+        timer.start()
+
+    def cancel(self):
+        with self._lock:
+            timer, token = self._timer, self._token
+            self._timer = self._token = None
+        if timer is not None:
+            timer.cancel()
+        if token is not None:
+            token.cancel()
+
+    def _check(self, url: str, token: CancellationToken):
+        try:
+            # the probe is abandoned as soon as a newer URL comes in
+            reachable, detail = token.run(self.probe, url, self.timeout)
+        except CrewCancelled:
+            return
+        self.cache.set(url, reachable, detail)
+        if not token.cancelled:
+            self.on_result(url, reachable, detail)
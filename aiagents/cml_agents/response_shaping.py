@@ -0,0 +1,172 @@
+import json
+from hashlib import sha256
+from os import environ, makedirs, replace
+from os.path import exists, join
+from re import findall, fullmatch
+from typing import Callable, Optional
+
+# Budget of a single API result handed back to the agent, in encoded characters.
+RESPONSE_BUDGET_CHARS = int(environ.get("API_RESPONSE_BUDGET_CHARS", "12000"))
+# Arrays longer than this are cut down to a sample together with their length.
+RESPONSE_SAMPLE_ITEMS = int(environ.get("API_RESPONSE_SAMPLE_ITEMS", "10"))
+RESPONSE_MAX_STRING = int(environ.get("API_RESPONSE_MAX_STRING", "500"))
+RESPONSE_SPILL_DIR = environ.get(
+    "API_RESPONSE_SPILL_DIR", join(environ.get("PROJECT_ROOT", "."), ".cache", "api_responses")
+)
+
+
+def response_schema(operation: Optional[dict]) -> Optional[dict]:
+    """The schema of the successful response of an operation of a path chunk, if it declares one."""
+    if not isinstance(operation, dict):
+        return None
+    responses = operation.get("responses") or {}
+    response = responses.get("200") or responses.get(200) or responses.get("201") or {}
+    # Swagger 2 keeps the schema on the response, OpenAPI 3 under its media types
+    return response.get("schema") or next(
+        (media.get("schema") for media in (response.get("content") or {}).values() if isinstance(media, dict)),
+        None,
+    )
+
+
+def _encode(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class ResponseShaper:
+    """
+    Cuts an API response down to what the agent needs before it is put into a prompt:
+    fields the response schema does not declare are projected away, empty values are
+    pruned, long arrays are sampled with their length kept, and long strings are
+    shortened. Samples and strings are halved until the result fits the budget.
+
+    `resolve` turns a schema "$ref" into the schema it points to, or None when the
+    definition is not available; projection then keeps that part of the response as is.
+    """
+
+    def __init__(
+        self,
+        resolve: Callable[[str], Optional[dict]] = None,
+        budget: int = None,
+        sample_items: int = None,
+        max_string: int = None,
+    ) -> None:
+        self.resolve = resolve or (lambda ref: None)
+        self.budget = budget or RESPONSE_BUDGET_CHARS
+        self.sample_items = sample_items or RESPONSE_SAMPLE_ITEMS
+        self.max_string = max_string or RESPONSE_MAX_STRING
+        self._resolved = {}
+
+    def _schema(self, schema):
+        for _ in range(16):
+            if not isinstance(schema, dict) or "$ref" not in schema:
+                break
+            ref = schema["$ref"]
+            if ref not in self._resolved:
+                self._resolved[ref] = self.resolve(ref)
+            schema = self._resolved[ref]
+        if isinstance(schema, dict) and "allOf" in schema:
+            merged = {"properties": {}}
+            for part in schema["allOf"]:
+                merged["properties"].update((self._schema(part) or {}).get("properties") or {})
+            return merged
+        return schema if isinstance(schema, dict) else None
+
+    def _shape(self, value, schema, sample_items, max_string):
+        schema = self._schema(schema)
+        if isinstance(value, dict):
+            properties = (schema or {}).get("properties")
+            shaped = {}
+            for key, item in value.items():
+                # keys the schema does not declare are projected away
+                if properties and key not in properties and not schema.get("additionalProperties"):
+                    continue
+                item = self._shape(item, (properties or {}).get(key), sample_items, max_string)
+                if item not in (None, "", [], {}):
+                    shaped[key] = item
+            return shaped
+        if isinstance(value, list):
+            items_schema = (schema or {}).get("items")
+            sample = [self._shape(item, items_schema, sample_items, max_string) for item in value[:sample_items]]
+            if len(value) > sample_items:
+                return {"count": len(value), "sample": sample}
+            return sample
+        if isinstance(value, str) and len(value) > max_string:
+            return value[:max_string] + f"... (+{len(value) - max_string} characters)"
+        return value
+
+    def shape(self, value, schema: dict = None):
+        """Shapes `value` against `schema`, tightening samples and strings until it fits the budget."""
+        if len(_encode(value)) <= self.budget:
+            return value
+        sample_items, max_string = self.sample_items, self.max_string
+        while True:
+            shaped = self._shape(value, schema, sample_items, max_string)
+            if len(_encode(shaped)) <= self.budget or (sample_items <= 1 and max_string <= 50):
+                return shaped
+            sample_items = max(sample_items // 2, 1)
+            max_string = max(max_string // 2, 50)
+
+
+def spill_response(value, spill_dir: str = None) -> str:
+    """Writes a full response to the spill directory and returns the handle to query it by."""
+    spill_dir = spill_dir or RESPONSE_SPILL_DIR
+    makedirs(spill_dir, exist_ok=True)
+    encoded = _encode(value)
+    handle = sha256(encoded.encode()).hexdigest()[:16]
+    location = join(spill_dir, f"{handle}.json")
+    if not exists(location):
+        with open(f"{location}.tmp", "w") as file:
+            file.write(encoded)
+        replace(f"{location}.tmp", location)
+    return handle
+
+
+def shape_response(value, schema: dict = None, shaper: ResponseShaper = None, spill_dir: str = None):
+    """
+    Shapes an API response for the agent. A response over the budget is also spilled
+    to disk in full, and the shaped result then carries the handle to query it by.
+    """
+    shaper = shaper or ResponseShaper()
+    if len(_encode(value)) <= shaper.budget:
+        return value
+    handle = spill_response(value, spill_dir)
+    return {
+        "response": shaper.shape(value, schema),
+        "handle": handle,
+        "note": (
+            "The response was shortened to fit. The full response can be queried with the "
+            f"api_response_query tool using the handle {handle}."
+        ),
+    }
+
+
+def _select(value, steps):
+    if not steps:
+        return value
+    step, rest = steps[0], steps[1:]
+    if step == "*":
+        return [_select(item, rest) for item in value] if isinstance(value, list) else None
+    if isinstance(value, list) and fullmatch(r"-?\d+", step):
+        return _select(value[int(step)], rest) if -len(value) <= int(step) < len(value) else None
+    if isinstance(value, dict):
+        return _select(value.get(step), rest)
+    return None
+
+
+def query_response(handle: str, query: str = "", shaper: ResponseShaper = None, spill_dir: str = None):
+    """
+    Reads part of a spilled response. `query` is a dotted path where list positions
+    are given in brackets and [*] selects every item, e.g. "projects[*].name" or
+    "projects[3]". The selection is shaped to the budget again, without projection.
+    """
+    spill_dir = spill_dir or RESPONSE_SPILL_DIR
+    if not fullmatch(r"[0-9a-f]{16}", handle or ""):
+        raise ValueError(f"{handle} is not a response handle")
+    location = join(spill_dir, f"{handle}.json")
+    if not exists(location):
+        raise FileNotFoundError(f"No stored response with the handle {handle}")
+    with open(location, "r") as file:
+        value = json.load(file)
+    steps = [step for step in findall(r"[^.\[\]]+|\[\*\]", query or "")]
+    selected = _select(value, [step.strip("[]") for step in steps])
+    return (shaper or ResponseShaper()).shape(selected)
@@ -0,0 +1,96 @@
+import re
+from json import loads
+from os import environ
+from os.path import basename, exists
+from typing import Dict, Optional
+
+
+def spec_aliases() -> Dict[str, str]:
+    """
+    User defined aliases of API Specification files, read from SPEC_ALIASES in .env as
+    a mapping of alias to file name, e.g. {'workbench': 'cml_swagger.json'}.
+    """
+    try:
+        aliases = loads(environ.get("SPEC_ALIASES", "{}").replace("'", '"'))
+    except ValueError:
+        return {}
+    return {alias.lower(): file_name for alias, file_name in aliases.items()}
+
+
+def swagger_file_name(metadata_file_location: str) -> str:
+    # the reverse of the {bucket}_metadata.json naming of swagger_parser
+    return basename(metadata_file_location).replace("_metadata", "")
+
+
+def spec_names(metadata_file_location: str):
+    """
+    The names a user may refer to an API Specification file by, in lower case: its
+    file name, and its bucket name when that has several words, e.g. "cml_swagger"
+    or "cml swagger". A one word bucket such as "jobs" is ordinary task wording and
+    is only matched through its file name or an alias.
+    """
+    file_name = swagger_file_name(metadata_file_location).lower()
+    bucket = file_name.split(".json")[0]
+    words = [word for word in re.split(r"[_\-.\s]+", bucket) if word]
+    if len(words) < 2:
+        return {file_name}
+    return {file_name, bucket, " ".join(words)}
+
+
+def _mentions(text: str, name: str) -> bool:
+    return bool(name) and re.search(rf"(?<![\w-]){re.escape(name)}(?![\w-])", text) is not None
+
+
+def route_spec(summaries: Dict[str, str], task: str = None, aliases: Dict[str, str] = None) -> Optional[dict]:
+    """
+    Picks the metadata file for a task without asking an LLM, when the choice is not
+    ambiguous: there is a single summarised API Specification file, or the task names
+    exactly one of them by its file name, a distinctive several word bucket name or
+    an alias. Returns the decision in the
+    shape of the Input Matcher's output, or None when the Input Matcher is needed.
+    """
+    if len(summaries) == 1:
+        location = next(iter(summaries))
+        reason = "It is the only API Specification file available."
+    elif task:
+        text = task.lower()
+        aliases = spec_aliases() if aliases is None else aliases
+        matched = {
+            location for location in summaries
+            if any(_mentions(text, name) for name in spec_names(location))
+            or any(
+                _mentions(text, alias) and file_name == swagger_file_name(location)
+                for alias, file_name in aliases.items()
+            )
+        }
+        if len(matched) != 1:
+            return None
+        location = matched.pop()
+        reason = "The task names this API Specification file explicitly."
+    else:
+        return None
+    return {
+        "file_name": basename(location),
+        "file_location": location,
+        "task": task or "",
+        "reason": reason,
+    }
+
+
+def read_summaries(metadata_summaries_path: str) -> Dict[str, str]:
+    if not exists(metadata_summaries_path):
+        return {}
+    with open(metadata_summaries_path, "r") as file:
+        try:
+            return loads(file.read())
+        except ValueError:
+            return {}
+
+
+def human_answer(output) -> str:
+    """The user's request from the output of the initial human input task."""
+    text = str(output or "")
+    try:
+        return loads(text).get("answer", text)
+    except (ValueError, AttributeError):
+        return text
@@ -0,0 +1,129 @@
+from json.encoder import encode_basestring_ascii
+
+
+def _encode_float(value):
+    # same spelling as the json module for the non-finite values
+    if value != value:
+        return "NaN"
+    if value == float("inf"):
+        return "Infinity"
+    if value == -float("inf"):
+        return "-Infinity"
+    return float.__repr__(value)
+
+
+def _escape_pointer_token(token):
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+class SpecSerializer:
+    """
+    Serializes dereferenced API Specification data to JSON in a single pass.
+
+    Only the objects on the active recursion stack are tracked: a subtree shared by
+    several parents is written in full wherever it appears, while an object that
+    contains itself is written as a `{"$ref": "#/..."}` back-pointer to the ancestor
+    it loops back to. Shared subtrees are encoded once and reused from a memo, and
+    acyclic data produces the same text as `json.dumps` with the same arguments.
+    """
+
+    def __init__(self, indent=None, separators=None):
+        self.indent = " " * indent if isinstance(indent, int) else indent
+        if separators is not None:
+            self.item_separator, self.key_separator = separators
+        elif indent is not None:
+            self.item_separator, self.key_separator = ",", ": "
+        else:
+            self.item_separator, self.key_separator = ", ", ": "
+
+    def encode(self, obj) -> str:
+        self._active = {}
+        self._seen = set()
+        self._memo = {}
+        self._back_pointers = 0
+        try:
+            return self._encode(obj, "#", 0)
+        finally:
+            self._active = self._seen = self._memo = None
+
+    def _encode(self, obj, pointer, level):
+        if isinstance(obj, str):
+            return encode_basestring_ascii(obj)
+        if obj is None:
+            return "null"
+        if obj is True:
+            return "true"
+        if obj is False:
+            return "false"
+        if isinstance(obj, int):
+            return int.__repr__(obj)
+        if isinstance(obj, float):
+            return _encode_float(obj)
+        if not isinstance(obj, (dict, list, tuple)):
+            raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+        key = id(obj)
+        if key in self._active:
+            self._back_pointers += 1
+            return self._encode_dict({"$ref": self._active[key]}, pointer, level)
+        if (key, level) in self._memo:
+            return self._memo[(key, level)]
+
+        self._active[key] = pointer
+        back_pointers = self._back_pointers
+        try:
+            if isinstance(obj, dict):
+                encoded = self._encode_dict(obj, pointer, level)
+            else:
+                encoded = self._encode_list(obj, pointer, level)
+        finally:
+            del self._active[key]
+
+        # a subtree that points back at its ancestors encodes differently elsewhere,
+        # anything else is memoised once it turns out to be shared
+        if self._back_pointers == back_pointers:
+            if key in self._seen:
+                self._memo[(key, level)] = encoded
+            else:
+                self._seen.add(key)
+        return encoded
+
+    def _encode_key(self, key):
+        if isinstance(key, str):
+            return encode_basestring_ascii(key)
+        if isinstance(key, (bool, int, float)) or key is None:
+            return encode_basestring_ascii(self._encode(key, None, 0))
+        raise TypeError(f"keys must be str, int, float, bool or None, not {type(key).__name__}")
+
+    def _join(self, parts, opening, closing, level):
+        if self.indent is None:
+            return opening + self.item_separator.join(parts) + closing
+        inner = "\n" + self.indent * (level + 1)
+        return (
+            opening + inner + (self.item_separator + inner).join(parts)
+            + "\n" + self.indent * level + closing
+        )
+
+    def _encode_dict(self, obj, pointer, level):
+        if not obj:
+            return "{}"
+        parts = [
+            self._encode_key(key) + self.key_separator
+            + self._encode(value, f"{pointer}/{_escape_pointer_token(str(key))}", level + 1)
+            for key, value in obj.items()
+        ]
+        return self._join(parts, "{", "}", level)
+
+    def _encode_list(self, obj, pointer, level):
+        if not obj:
+            return "[]"
+        parts = [
+            self._encode(value, f"{pointer}/{index}", level + 1)
+            for index, value in enumerate(obj)
+        ]
+        return self._join(parts, "[", "]", level)
+
+
+def dump_spec(obj, file, indent=None, separators=None):
+    """Writes `obj` to `file` with the SpecSerializer."""
+    file.write(SpecSerializer(indent=indent, separators=separators).encode(obj))
@@ -0,0 +1,142 @@
+import os
+from hashlib import sha256
+from tempfile import NamedTemporaryFile
+from typing import Optional
+
+import ijson
+
+from .parse_for_manager import STREAMING_THRESHOLD_MB
+
+# how much of an upload is read and written at a time
+UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_KB", "1024")) * 1024
+
+
+class SpecUploadError(ValueError):
+    pass
+
+
+class _SpecEvents:
+    """
+    Receives the parser events of an uploaded document. It checks that the document
+    is an object with a "paths" object and an "openapi" or "swagger" version, and
+    builds the document until the writer drops the builder.
+    """
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.top_level = None
+        self.key = None
+        self.keys = set()
+        self.builder: Optional[ijson.ObjectBuilder] = ijson.ObjectBuilder()
+
+    def send(self, item):
+        event, value = item
+        if self.builder is not None:
+            self.builder.event(event, value)
+        if self.depth == 0 and self.top_level is None:
+            self.top_level = event
+            if event != "start_map":
+                raise SpecUploadError("An API Specification file must hold a JSON object")
+        if event == "map_key" and self.depth == 1:
+            self.key = value
+            self.keys.add(value)
+        elif event in ("start_map", "start_array"):
+            if self.depth == 1 and self.key == "paths" and event != "start_map":
+                raise SpecUploadError('The "paths" of an API Specification file must be an object')
+            self.depth += 1
+        elif event in ("end_map", "end_array"):
+            self.depth -= 1
+        elif self.depth == 1 and self.key == "paths":
+            raise SpecUploadError('The "paths" of an API Specification file must be an object')
+
+    def check(self):
+        if "paths" not in self.keys:
+            raise SpecUploadError('The API Specification file has no "paths"')
+        if not self.keys & {"openapi", "swagger"}:
+            raise SpecUploadError('The API Specification file declares neither an "openapi" nor a "swagger" version')
+
+
+def check_spec(file):
+    """
+    Checks an API Specification file object with the incremental parser, like an
+    upload is checked, without building the document. Raises SpecUploadError.
+    """
+    events = _SpecEvents()
+    events.builder = None
+    try:
+        for item in ijson.basic_parse(file, use_float=True):
+            events.send(item)
+    except ijson.JSONError as e:
+        raise SpecUploadError(f"The API Specification file is not valid JSON: {e}") from e
+    events.check()
+
+
+class StreamingSpecWriter:
+    """
+    Writes an uploaded API Specification file to a temporary file in `directory`
+    chunk by chunk, while hashing it and checking it with an incremental JSON
+    parser, so the upload is never held in memory as a whole. `commit` moves the
+    file into place atomically under its name; `discard` drops it.
+
+    Documents of up to `keep_mb` (SWAGGER_STREAMING_THRESHOLD_MB) are built while
+    they are checked and handed on as `document`, so the ingestion pipeline does
+    not parse them again. Bigger ones are left to the streaming reader of
+    swagger_parser and `document` is None.
+    """
+
+    def __init__(self, directory: str, keep_mb: float = None) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.keep_bytes = (STREAMING_THRESHOLD_MB if keep_mb is None else keep_mb) * 1024 * 1024
+        self.size = 0
+        self._digest = sha256()
+        self._events = _SpecEvents()
+        self._parser = ijson.basic_parse_coro(self._events, use_float=True)
+        self._file = NamedTemporaryFile(dir=directory, prefix=".upload-", suffix=".part", delete=False)
+        self.document = None
+
+    @property
+    def digest(self) -> str:
+        return self._digest.hexdigest()
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.keep_bytes:
+            self._events.builder = None
+        self._digest.update(chunk)
+        self._file.write(chunk)
+        try:
+            self._parser.send(chunk)
+        except ijson.JSONError as e:
+            self.discard()
+            raise SpecUploadError(f"The API Specification file is not valid JSON: {e}") from e
+        except SpecUploadError:
+            self.discard()
+            raise
+
+    def close(self):
+        """Completes the checks once the last chunk is written, raises SpecUploadError for an invalid file."""
+        try:
+            self._parser.close()
+            self._events.check()
+        except ijson.JSONError as e:
+            self.discard()
+            raise SpecUploadError(f"The API Specification file is not valid JSON: {e}") from e
+        except SpecUploadError:
+            self.discard()
+            raise
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        if self._events.builder is not None:
+            self.document = self._events.builder.value
+
+    def commit(self, file_name: str) -> str:
+        file_location = os.path.join(self.directory, os.path.basename(file_name))
+        os.replace(self._file.name, file_location)
+        return file_location
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self._file.name):
+            os.remove(self._file.name)
@@ -0,0 +1,98 @@
+import json
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from os import environ
+from threading import Lock
+from typing import Optional
+
+from .parse_for_manager import STREAMING_THRESHOLD_MB, content_hash
+from .spec_upload import check_spec
+
+
+class SpecValidation:
+    """
+    The outcome of validating an uploaded API Specification file, with the document
+    parsed from it unless the file was too big to be parsed as a whole.
+    """
+
+    def __init__(self, digest: str, document: dict = None, error: str = None) -> None:
+        self.digest = digest
+        self.document = document
+        self.error = error
+
+    @property
+    def valid(self) -> bool:
+        return self.error is None
+
+
+def validate_spec(content: bytes, digest: str = None) -> SpecValidation:
+    """
+    Parses `content` and checks it against the OpenAPI specification, whatever its
+    size. Files bigger than SWAGGER_STREAMING_THRESHOLD_MB are first checked by the
+    streaming parser, as uploads are, so a malformed one fails before it is parsed
+    as a whole; their document is dropped once validated, swagger_parser streams them.
+    """
+    from openapi_spec_validator import validate
+
+    digest = digest or content_hash(content)
+    streamed = len(content) > STREAMING_THRESHOLD_MB * 1024 * 1024
+    try:
+        if streamed:
+            check_spec(BytesIO(content))
+        document = json.loads(content)
+        validate(document)
+    except Exception as e:
+        return SpecValidation(digest, error=str(e))
+    return SpecValidation(digest, None if streamed else document)
+
+
+class SpecValidator:
+    """
+    Validates API Specification files on a background thread, so a big spec does
+    not freeze the UI. Results are kept by content hash for the last `cache_size`
+    (SPEC_VALIDATION_CACHE_SIZE) files: the same file is not validated twice, and
+    the parsed document of a file under the streaming threshold is there for the
+    upload that follows the validation.
+    """
+
+    def __init__(self, max_workers: int = None, cache_size: int = None) -> None:
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or int(environ.get("SPEC_VALIDATION_WORKERS", "2")),
+            thread_name_prefix="spec-validation",
+        )
+        self.cache_size = cache_size or int(environ.get("SPEC_VALIDATION_CACHE_SIZE", "4"))
+        self._results: "OrderedDict[str, SpecValidation]" = OrderedDict()
+        self._pending = {}
+        self._lock = Lock()
+
+    def submit(self, content: bytes) -> Future:
+        """Returns a future of the SpecValidation of `content`, already done when it is cached."""
+        digest = content_hash(content)
+        with self._lock:
+            if digest in self._results:
+                self._results.move_to_end(digest)
+                future = Future()
+                future.set_result(self._results[digest])
+                return future
+            if digest in self._pending:
+                return self._pending[digest]
+            future = self._pending[digest] = self.executor.submit(validate_spec, content, digest)
+        future.add_done_callback(lambda done: self._store(digest, done))
+        return future
+
+    def _store(self, digest: str, future: Future):
+        with self._lock:
+            self._pending.pop(digest, None)
+            if future.exception() is None:
+                self._results[digest] = future.result()
+                while len(self._results) > self.cache_size:
+                    self._results.popitem(last=False)
+
+    def result(self, content: bytes) -> Optional[SpecValidation]:
+        """The cached validation of `content`, if it is still cached."""
+        with self._lock:
+            return self._results.get(content_hash(content))
+
+
+spec_validator = SpecValidator()
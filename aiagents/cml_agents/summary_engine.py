@@ -0,0 +1,133 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from os import environ
+from random import uniform
+from threading import Lock
+from time import monotonic, sleep
+from typing import Callable, Dict
+
+
+class RateLimiter:
+    """
+    Sliding one minute window over the requests and tokens sent to the LLM.
+    `acquire` blocks until both budgets have room for the next request.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int) -> None:
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._window = deque()
+        self._tokens = 0
+        self._lock = Lock()
+
+    def acquire(self, tokens: int):
+        while True:
+            with self._lock:
+                now = monotonic()
+                while self._window and now - self._window[0][0] >= 60:
+                    self._tokens -= self._window.popleft()[1]
+                # a single request bigger than the whole budget is let through on an empty window
+                if len(self._window) < self.requests_per_minute and (
+                    self._tokens + tokens <= self.tokens_per_minute or not self._window
+                ):
+                    self._window.append((now, tokens))
+                    self._tokens += tokens
+                    return
+                wait = 60 - (now - self._window[0][0])
+            sleep(max(wait, 0.01))
+
+
+def _status_code(error: Exception):
+    return getattr(error, "status_code", None) or getattr(
+        getattr(error, "response", None), "status_code", None
+    )
+
+
+def _retry_after(error: Exception):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits (429) and server side errors are worth another attempt."""
+    status = _status_code(error)
+    if type(error).__name__ in ("RateLimitError", "APITimeoutError", "APIConnectionError"):
+        return True
+    return status == 429 or (isinstance(status, int) and status >= 500)
+
+
+class SummaryEngine:
+    """
+    Summarises many prompts concurrently with a bounded pool of workers while
+    keeping to request-per-minute and token-per-minute budgets. Rate limited and
+    transient failures are retried with jittered exponential backoff.
+
+    `summarise` is any callable turning a prompt into a summary, so the engine can
+    be pointed at a real deployment or at a local fake LLM server alike.
+    """
+
+    def __init__(
+        self,
+        summarise: Callable[[str], str],
+        max_workers: int = None,
+        requests_per_minute: int = None,
+        tokens_per_minute: int = None,
+        max_retries: int = None,
+        completion_tokens: int = 1024,
+    ) -> None:
+        self.summarise = summarise
+        self.max_workers = max_workers or int(environ.get("SUMMARY_MAX_WORKERS", "4"))
+        self.max_retries = max_retries if max_retries is not None else int(
+            environ.get("SUMMARY_MAX_RETRIES", "5")
+        )
+        self.completion_tokens = completion_tokens
+        self.rate_limiter = RateLimiter(
+            requests_per_minute or int(environ.get("LLM_REQUESTS_PER_MINUTE", "60")),
+            tokens_per_minute or int(environ.get("LLM_TOKENS_PER_MINUTE", "80000")),
+        )
+
+    def estimate_tokens(self, prompt: str) -> int:
+        # roughly four characters per token, plus room for the answer
+        return len(prompt) // 4 + self.completion_tokens
+
+    def _summarise_with_retries(self, prompt: str) -> str:
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(self.estimate_tokens(prompt))
+            try:
+                return self.summarise(prompt)
+            except Exception as error:
+                if attempt >= self.max_retries or not is_retryable(error):
+                    raise
+                delay = _retry_after(error) or uniform(0, min(60, 2 ** attempt))
+                print(f"Summary request failed with {error}, retrying in {delay:.1f}s")
+                sleep(delay)
+                attempt += 1
+
+    def run(
+        self,
+        prompts: Dict[str, str],
+        on_result: Callable[[str, str], None],
+    ) -> Dict[str, Exception]:
+        """
+        Summarises every `{key: prompt}` and hands each summary to `on_result(key, summary)`
+        as soon as it is ready, so callers can persist progress incrementally.
+        Returns the errors of the prompts that could not be summarised.
+        """
+        failures = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._summarise_with_retries, prompt): key
+                for key, prompt in prompts.items()
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    on_result(key, future.result())
+                except Exception as error:
+                    print(f"Could not summarise {key}: {error}")
+                    failures[key] = error
+        return failures
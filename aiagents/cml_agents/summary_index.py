@@ -0,0 +1,155 @@
+import json
+import math
+import os
+from hashlib import blake2b
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+
+from .endpoint_index import tokenize
+from .parse_for_manager import content_hash
+
+
+class HashingEmbedding:
+    """
+    Offline embedding that needs nothing but the CPU: the word stems and word pairs
+    of a text are hashed into a fixed number of signed buckets and the vector is
+    normalised. It captures vocabulary overlap, not meaning, which is enough to
+    route a task to the spec whose summary talks about the same resources.
+    """
+
+    def __init__(self, dimensions: int = 1024) -> None:
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    def _bucket(self, feature: str):
+        digest = int.from_bytes(blake2b(feature.encode(), digest_size=8).digest(), "big")
+        return digest % self.dimensions, 1.0 if digest >> 63 else -1.0
+
+    def embed(self, text: str) -> List[float]:
+        tokens = tokenize(text)
+        vector = [0.0] * self.dimensions
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            bucket, sign = self._bucket(feature)
+            vector[bucket] += sign
+        # sublinear weights, so a summary repeating a word does not drown out the rest
+        vector = [math.copysign(math.log1p(abs(value)), value) for value in vector]
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed(text) for text in texts]
+
+
+class LangchainEmbedding:
+    """Adapts a langchain Embeddings model, e.g. OpenAIEmbeddings, to the index."""
+
+    def __init__(self, embeddings, name: str) -> None:
+        self.embeddings = embeddings
+        self.name = name
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+
+def embedding_function(openai_provider: str = None):
+    """
+    The embedding used for summaries, chosen by SUMMARY_EMBEDDINGS: "hashing", the
+    offline default, or "openai" for the EMBEDDING_MODEL deployment of the OpenAI
+    provider in use.
+    """
+    if os.environ.get("SUMMARY_EMBEDDINGS", "hashing").lower() != "openai":
+        return HashingEmbedding()
+    from langchain_openai import AzureOpenAIEmbeddings, OpenAIEmbeddings
+
+    model = os.environ.get("EMBEDDING_MODEL", "text-embedding-3-small")
+    if openai_provider == "AZURE_OPENAI":
+        return LangchainEmbedding(AzureOpenAIEmbeddings(azure_deployment=model), f"azure-{model}")
+    return LangchainEmbedding(OpenAIEmbeddings(model=model), f"openai-{model}")
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return sum(x * y for x, y in zip(a, b)) / norm if norm else 0.0
+
+
+class SummaryVectorIndex:
+    """
+    Vector index over the metadata summaries, stored next to the summaries file.
+    `update` embeds only the summaries that are new or changed since the last run
+    and drops the removed ones; switching the embedding re-embeds everything.
+    `search` returns the specs whose summaries are closest to a task.
+    """
+
+    def __init__(self, index_location: str, embed: Callable[[List[str]], List[List[float]]] = None) -> None:
+        self.index_location = index_location
+        self.embed = embed or embedding_function()
+        self.entries: Dict[str, dict] = {}
+        self._lock = Lock()
+        if os.path.exists(index_location):
+            with open(index_location, "r") as f:
+                stored = json.load(f)
+            if stored.get("embedding") == getattr(self.embed, "name", None):
+                self.entries = stored["entries"]
+
+    def update(self, summaries: Dict[str, str]) -> int:
+        """Brings the index in line with `{metadata file location: summary}`, returns the number embedded."""
+        with self._lock:
+            for location in [location for location in self.entries if location not in summaries]:
+                del self.entries[location]
+            pending = {
+                location: summary
+                for location, summary in summaries.items()
+                if self.entries.get(location, {}).get("hash") != content_hash(summary)
+            }
+            if pending:
+                vectors = self.embed(list(pending.values()))
+                for (location, summary), vector in zip(pending.items(), vectors):
+                    self.entries[location] = {
+                        "hash": content_hash(summary),
+                        "vector": vector,
+                        "summary": summary,
+                    }
+            with open(f"{self.index_location}.tmp", "w") as f:
+                json.dump(
+                    {"embedding": getattr(self.embed, "name", None), "entries": self.entries},
+                    f,
+                    separators=(",", ":"),
+                )
+            os.replace(f"{self.index_location}.tmp", self.index_location)
+            return len(pending)
+
+    def search(self, query: str, top_k: int = 3, preview: int = 600) -> List[dict]:
+        if not self.entries:
+            return []
+        vector = self.embed([query])[0]
+        scored = sorted(
+            ((_cosine(vector, entry["vector"]), location) for location, entry in self.entries.items()),
+            reverse=True,
+        )
+        return [
+            {
+                "file_name": os.path.basename(location),
+                "file_location": location,
+                "score": round(score, 3),
+                "summary": self.entries[location]["summary"][:preview],
+            }
+            for score, location in scored[:top_k]
+        ]
+
+
+def summary_index_path(metadata_summaries_path: str) -> str:
+    return f"{metadata_summaries_path}.vectors"
+
+
+_loaded: Dict[str, tuple] = {}
+
+
+def load_summary_index(metadata_summaries_path: str, embed=None) -> Optional[SummaryVectorIndex]:
+    """The summary index, kept in memory until SummaryGenerator rewrites it, or None if it was never built."""
+    index_location = summary_index_path(metadata_summaries_path)
+    if not os.path.exists(index_location):
+        return None
+    modified = os.path.getmtime(index_location)
+    if index_location not in _loaded or _loaded[index_location][0] != modified:
+        _loaded[index_location] = (modified, SummaryVectorIndex(index_location, embed))
+    return _loaded[index_location][1]
@@ -20,8 +20,8 @@ class TasksInitialize:
                 k:v pair json, where the key is the location of the summarized swagger file, and the value is 
                 the generated summary.
 
-                If the metadata summary has already been generated, consider this task as complete, and take no 
-                further actions.
+                The tool only summarises the swagger files that are new or have changed since it last ran. If it reports
+                that the metadata summaries are up to date, consider this task as complete, and take no further actions.
 
                 Make no assumptions whatsoever.
                 """
@@ -132,9 +132,10 @@ class Tasks:
                 """
                 Complete the following steps:
                 1. Fetch Metadata Summary:
-                    1. Use the 'file read tool' to retrieve the metadata summary file. Ensure the contents are fully loaded before proceeding. If and only if no metadata summary file is available, return an error message indicating no API spec is available and Finish Execution by throwing an error with apt messaging..
+                    1. Use the 'summary search' tool with the task at hand to retrieve the metadata summaries closest to it, each with the file name and location of its metadata file.
+                    2. Only if the search is not conclusive, use the 'file read tool' to retrieve the whole metadata summary file. Ensure the contents are fully loaded before proceeding. If and only if no metadata summary file is available, return an error message indicating no API spec is available and Finish Execution by throwing an error with apt messaging..
                 2. Identify the Relevant Swagger File:
-                    1. Review the metadata file, which consists of key-value pairs where each key is the path of a Swagger file and each value is a summary.
+                    1. Review the candidate summaries, or the metadata file, which consists of key-value pairs where each key is the path of a Swagger file and each value is a summary.
                     2. Based on the context provided by the human input task, analyze the summaries to determine which Swagger file aligns best with the task requirements.
                 3. Infer the Best Swagger File:
                     1. Critical step: If the summaries are unclear or do not directly indicate the appropriate Swagger file, make a logical assumption based on the descriptions and your understanding of the task.
@@ -217,10 +218,12 @@ class Tasks:
             description=dedent(
                 """
                 Follow the following steps:
-                1. Read the Metadata File:
-                    1. Use the 'file read tool' to access the metadata file. The file location can be found in the context provided by the 'input matcher' agent.
+                1. Search the Metadata File:
+                    1. Use the 'endpoint search' tool with the user query and the metadata file found in the context provided by the 'input matcher' agent,
+                    to get the candidate endpoints best suited to the query.
+                    2. Only if none of the candidates fit the query, use the 'file read tool' to access the whole metadata file.
                 2. Select Endpoint and HTTP Method:
-                    1. Analyze the metadata to identify the Swagger file that contains the endpoint most suited to the user query.
+                    1. Analyze the candidates to identify the Swagger file that contains the endpoint most suited to the user query.
                     2. Match the user’s query to endpoint descriptions by evaluating the similarity between the user's intent and the function of the endpoint.
                 3. Justify Endpoint Selection using Decision Validator Agent:
                     1. Present the selected endpoint and HTTP method to the 'decision validator' agent, explaining how it aligns with the user’s query. 
@@ -230,6 +233,7 @@ class Tasks:
                     2. Ensure the updated selection addresses the user's query, and seek validation again if necessary.
                 5. Provide Parameters to User:
                     1. Extract both required and optional parameters from the selected endpoint's Swagger file.
+                        If a schema in the file is given as a "$ref", read it using the 'definition fetcher' tool with the chunk file path and the "$ref" value.
                     2. Present the user with a clear list of required and optional parameters:
                         1. Required parameters: List them along with brief descriptions.
                         2. Optional parameters: Highlight optional parameters and describe how they enhance functionality.
@@ -244,6 +248,8 @@ class Tasks:
                     2. Display the payload to the user for their review and confirmation before proceeding with the API call.
                 9. Execute the API Call:
                     1. Use the 'api-caller' tool to trigger the API call with the payload and intelligently handle any errors that occur during the process. 
+                    If the task needs the same kind of call for many items (for example the runtimes of every project), make them all at once using the 'api batch caller' tool instead.
+                    If a response was shortened and comes with a handle, read the parts of it you need using the 'api response query' tool instead of calling the API again.
                     2. If the issue requires user input or clarification, invoke the 'get human input' tool to ask the user for the relevant information.
                     3. If the API Endpoint or API Bearer Token are found to be incorrect, fetch their correct values from the user using the 'get human input' tool, 
                     and update the 'API_ENDPOINT' or 'API_BEARER_TOKEN' respectively using the 'update env variables' tool.
@@ -273,3 +279,33 @@ class Tasks:
             agent=agents["manager_agent"],
         )
 
+        self._manager_description = self.manager_task.description
+        self._manager_context = list(self.manager_task.context)
+
+    def reset(self):
+        """Clears the outputs and routing of the previous conversation, so the tasks can run again."""
+        self.manager_task.description = self._manager_description
+        self.manager_task.context = list(self._manager_context)
+        for task in (
+            self.initial_human_input_task,
+            self.task_matching_task,
+            self.validator_task,
+            self.manager_task,
+        ):
+            task.output = None
+
+    def route_to(self, decision: dict):
+        """
+        Hands a metadata file chosen without the Input Matcher to the manager task, in
+        place of the output of the task matching task which is then not run.
+        """
+        self.manager_task.description += dedent(
+            f"""
+            The 'input matcher' step has already been resolved: use the swagger metadata file
+            {decision["file_name"]} located at {decision["file_location"]}. {decision["reason"]}
+            """
+        )
+        self.manager_task.context = [
+            task for task in self.manager_task.context if task is not self.task_matching_task
+        ]
+
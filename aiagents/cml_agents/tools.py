@@ -1,26 +1,28 @@
-from ast import literal_eval
-from os import makedirs, listdir, environ
-from os.path import join, exists
-from dotenv import get_key, load_dotenv, find_dotenv, set_key
+from os import makedirs, listdir, environ, sep, replace
+from os.path import join, exists, dirname, realpath
 from textwrap import dedent
-from json import dump, loads
-from requests import get, post, patch, delete
-from time import sleep
+from json import dump, dumps, loads
+from threading import Lock
 import panel as pn
 
 from crewai_tools import BaseTool, FileReadTool, DirectoryReadTool, tool
 
-from langchain_community.agent_toolkits import FileManagementToolkit
-from langchain_openai import AzureChatOpenAI, ChatOpenAI
 from langchain.agents import Tool
 from langchain.prompts import PromptTemplate
-from langchain.schema import HumanMessage
 
-from typing import Dict
+from typing import Any, Dict, List
 
 from aiagents.config import configuration
+from aiagents.custom_threading.handoff import HumanInputTimeout
+from aiagents.llm_cache import cached_completion, get_llm_cache
 
-from .parse_for_manager import swagger_parser
+from .parse_for_manager import swagger_parser, definition_file_name, file_hash, find_path_operation, DEFINITIONS_FOLDER_NAME
+from .pagination import pagination_parameters, iter_pages, collect_pages, aggregate_schema
+from .response_shaping import ResponseShaper, response_schema, shape_response, query_response
+from .summary_engine import SummaryEngine
+from .endpoint_index import load_endpoint_index
+from .summary_index import SummaryVectorIndex, embedding_function, load_summary_index, summary_index_path
+from .http_client import call_batch, get_api_client, resolve_api_target, invalidate_api_targets
 
 from aiagents.panel_utils.panel_stylesheets import chat_stylesheet
 
@@ -30,15 +32,29 @@ generated_directory_traverser = DirectoryReadTool(
     directory=configuration.generated_folder_path
 )
 
+def directory_lister(root_dir: str):
+    """
+    The list_directory tool of the langchain file management toolkit for `root_dir`,
+    built on its first call instead of when this module is imported.
+    """
+    list_directory = []
+
+    def run(*args, **kwargs):
+        if not list_directory:
+            from langchain_community.agent_toolkits import FileManagementToolkit
+
+            list_directory.append(
+                FileManagementToolkit(root_dir=root_dir, selected_tools=["list_directory"]).get_tools()[0]
+            )
+        return list_directory[0].run(*args, **kwargs)
+
+    return run
+
+
 generated_directory_lister = Tool(
     name="generated_directory_lister",
     # use langchain toolkit to list all the files in the generated folder
-    func=FileManagementToolkit(
-        root_dir=configuration.generated_folder_path,
-        selected_tools=["list_directory"],
-    )
-    .get_tools()[0]
-    .run,
+    func=directory_lister(configuration.generated_folder_path),
     description=dedent(
         f"""
         This tool will list all the files in the '{configuration.generated_folder_path}' directory and no other. It takes 
@@ -51,12 +67,7 @@ generated_directory_lister = Tool(
 swagger_directory_lister = Tool(
     name="swagger_directory_lister",
     # use langchain toolkit to list all the files in the generated folder
-    func=FileManagementToolkit(
-        root_dir=configuration.swagger_files_directory,
-        selected_tools=["list_directory"],
-    )
-    .get_tools()[0]
-    .run,
+    func=directory_lister(configuration.swagger_files_directory),
     description=dedent(
         f"""
         This tool will list all the files in the '{configuration.swagger_files_directory}' directory and no other. It takes 
@@ -92,16 +103,17 @@ def get_human_input(agent_name: str, agent_question: str) -> str:
     configuration.spinner.value = False
     configuration.spinner.visible = False
 
-    while configuration.user_input == None:
-        sleep(1)
-
-    human_comments = configuration.user_input
-    configuration.user_input = None
-
-    configuration.spinner.value = True
-    configuration.spinner.visible = True
-
-    configuration.chat_interface.widgets[0].disabled = True
+    # Woken by the chat callback as soon as the user replies
+    timeout = environ.get("HUMAN_INPUT_TIMEOUT_SECONDS")
+    try:
+        human_comments = configuration.human_input.get(timeout=float(timeout) if timeout else None)
+    except HumanInputTimeout:
+        human_comments = f"The user did not reply within {timeout} seconds."
+    finally:
+        configuration.spinner.value = True
+        configuration.spinner.visible = True
+
+        configuration.chat_interface.widgets[0].disabled = True
     return human_comments
 
 
@@ -113,28 +125,89 @@ def update_env_variables(*, API_ENDPOINT: str = None, API_BEARER_TOKEN: str = No
     - API_BEARER_TOKEN: The API Endpoint (Optional) to be updated in case of faulty API Endpoint in the .env file
     """
     print("values received", API_BEARER_TOKEN, "\n", API_ENDPOINT)
-    env_file = find_dotenv()
-    load_dotenv(env_file)
 
+    # kept on the session, the .env file is shared by every session of the process
     if API_ENDPOINT:
-        # Update API endpoint in the .env file
-        api_endpoint = (
-            literal_eval(get_key(env_file, "API_ENDPOINT"))
-            if get_key(env_file, "API_ENDPOINT")
-            else {}
-        )
-        api_endpoint[configuration.selected_swagger_file] = API_ENDPOINT
-        set_key(env_file, "API_ENDPOINT", api_endpoint, quote_mode="never")
+        configuration.api_endpoints[configuration.selected_swagger_file] = API_ENDPOINT
 
     if API_BEARER_TOKEN:
-        # Update API bearer token in the .env file
-        api_bearer_token = (
-            literal_eval(get_key(env_file, "API_BEARER_TOKEN"))
-            if get_key(env_file, "API_BEARER_TOKEN")
-            else {}
-        )
-        api_bearer_token[configuration.selected_swagger_file] = API_BEARER_TOKEN
-        set_key(env_file, "API_BEARER_TOKEN", api_bearer_token, quote_mode="never")
+        configuration.api_bearer_tokens[configuration.selected_swagger_file] = API_BEARER_TOKEN
+
+    invalidate_api_targets()
+
+
+@tool("definition_fetcher")
+def definition_fetcher(chunk_file: str, ref: str) -> str:
+    """
+    This function will read a shared schema definition that an API Specification chunk file refers to
+    through a "$ref". It has 2 parameter it accepts:
+    - chunk_file: The path of the chunk file in which the "$ref" was found
+    - ref: The value of the "$ref", for example "#/components/schemas/Project"
+    The returned definition may contain further "$ref"s which can be read with this tool as well.
+    """
+    definition_file = join(dirname(chunk_file), DEFINITIONS_FOLDER_NAME, definition_file_name(ref))
+    if not realpath(definition_file).startswith(realpath(configuration.generated_folder_path) + sep):
+        return f"The chunk file {chunk_file} is not part of the generated API Specification files."
+    if not exists(definition_file):
+        return f"No shared definition found for {ref}. The schema is inlined in the chunk file itself."
+    with open(definition_file, "r") as file:
+        return file.read()
+
+
+@tool("summary_search")
+def summary_search(task: str, top_k: int = 3) -> str:
+    """
+    This function will search the metadata summaries for the API Specification files best suited to a task,
+    instead of reading every summary. It has 2 parameter it accepts:
+    - task: The task at hand in plain english, for example "list all the projects of a user"
+    - top_k: The number of candidate files to return, 3 by default
+    It returns the candidates best first, each with the file name and location of its metadata file, a
+    similarity score and the beginning of its summary.
+    """
+    index = load_summary_index(
+        configuration.metadata_summaries_path, embedding_function(configuration.openai_provider)
+    )
+    if index is None:
+        return f"No summary index is available, read the metadata summaries from {configuration.metadata_summaries_path} instead."
+    candidates = index.search(task, int(top_k))
+    if not candidates:
+        return "No API Specification file has been summarised yet. Please use ADMIN API to upload an OPEN API spec file."
+    return dumps(candidates)
+
+
+@tool("endpoint_search")
+def endpoint_search(task: str, metadata_file: str = "", top_k: int = 5) -> str:
+    """
+    This function will search the endpoints of an API Specification file for the ones best suited to a task,
+    instead of reading its whole metadata file. It has 3 parameter it accepts:
+    - task: The task at hand in plain english, for example "list all the projects of a user"
+    - metadata_file: The name or location of the metadata file chosen by the input matcher. Defaults to the
+    API Specification file selected for the conversation
+    - top_k: The number of candidate endpoints to return, 5 by default
+    It returns the candidates best first, each with its path, method, summary, parameter names and the chunk
+    file holding its full specification, which can be read with the file read tool.
+    """
+    index = load_endpoint_index(
+        configuration.generated_folder_path, metadata_file or configuration.selected_swagger_file
+    )
+    if index is None:
+        return "No endpoint index is available for this API Specification file, read its metadata file instead."
+    candidates = index.search(task, int(top_k))
+    if not candidates:
+        return "No endpoint matches the task, read the metadata file instead."
+    return dumps(candidates)
+
+
+def _dump_atomically(content, file_location):
+    # write next to the target and swap it in, so an interrupted run never leaves a torn file
+    with open(f"{file_location}.tmp", "w") as file:
+        dump(content, file)
+    replace(f"{file_location}.tmp", file_location)
+
+
+# Summaries, their manifest and their vector index are shared by every session and
+# ingestion job of the process, one summary run updates them at a time
+_summaries_lock = Lock()
 
 
 class SummaryGenerator(BaseTool):
@@ -151,16 +224,56 @@ class SummaryGenerator(BaseTool):
     def __init__(self):
         super().__init__()
 
+    def _index_summaries(self, swagger_summaries):
+        index = SummaryVectorIndex(
+            summary_index_path(configuration.metadata_summaries_path),
+            embedding_function(configuration.openai_provider),
+        )
+        embedded = index.update(swagger_summaries)
+        print(f"Embedded {embedded} summaries into: {index.index_location}")
+
     def _run(self):
-        if exists(join(configuration.generated_folder_path, "metadata_summaries")):
-            return """Metadata summaries have already been generated. Exiting."""
+        with _summaries_lock:
+            return self._summarise()
 
+    def _summarise(self):
         makedirs(
             join(configuration.generated_folder_path, "summaries"),
             exist_ok=True,
         )
 
+        # Summaries are kept across uploads together with the hash of the metadata file
+        # they were generated from, so only new or changed specs are sent to the LLM.
+        manifest_path = f"{configuration.metadata_summaries_path}.manifest"
         swagger_summaries = {}
+        summary_hashes = {}
+        if exists(configuration.metadata_summaries_path) and exists(manifest_path):
+            with open(configuration.metadata_summaries_path, "r") as file:
+                swagger_summaries = loads(file.read())
+            with open(manifest_path, "r") as file:
+                summary_hashes = loads(file.read())
+
+        metadata_hashes = {
+            join(configuration.generated_folder_path, filename): file_hash(
+                join(configuration.generated_folder_path, filename)
+            )
+            for filename in listdir(configuration.generated_folder_path)
+            # all the generated metadata files
+            if filename.endswith(".json")
+        }
+        removed = [location for location in swagger_summaries if location not in metadata_hashes]
+        for location in removed:
+            swagger_summaries.pop(location, None)
+            summary_hashes.pop(location, None)
+        pending = [
+            location for location, metadata_hash in metadata_hashes.items()
+            if summary_hashes.get(location) != metadata_hash or location not in swagger_summaries
+        ]
+        if not pending and not removed:
+            # an index missing from an older install is built from the existing summaries
+            if not exists(summary_index_path(configuration.metadata_summaries_path)):
+                self._index_summaries(swagger_summaries)
+            return f"""Metadata summaries are up to date. The summaries are in the file {configuration.metadata_summaries_path}"""
 
         human_template = """
         Generate a summary of the below provided metadata that is descriptive and concise. 
@@ -177,40 +290,93 @@ class SummaryGenerator(BaseTool):
         {json_content}
         ```
         """
-        llm = AzureChatOpenAI(azure_deployment=environ.get(
-            "AZURE_OPENAI_DEPLOYMENT", "cml"
-        )) if configuration.openai_provider == "AZURE_OPENAI" else ChatOpenAI()
+        llm = configuration.chat_model()
         prompt_template = PromptTemplate(
             template=human_template, input_variables=["json_content"]
         )
 
-        for filename in listdir(configuration.generated_folder_path):
-            # all the generated metadata files
-            if filename.endswith(".json"):
-                json_content = ""
-                with open(
-                    join(configuration.generated_folder_path, filename), "r"
-                ) as file:
-                    json_content = file.read()
-
-                prompt = prompt_template.format(json_content=json_content)
-                message = HumanMessage(content=prompt)
-                results = llm(messages=[message])
-                swagger_summaries[
-                    join(configuration.generated_folder_path, filename)
-                ] = results.content
-
-        dump(
-            swagger_summaries,
-            open(
-                configuration.metadata_summaries_path,
-                "w",
-            ),
-        )
+        prompts = {}
+        for location in pending:
+            with open(location, "r") as file:
+                prompts[location] = prompt_template.format(json_content=file.read())
+
+        # Progress is persisted after every summary, so an interrupted run resumes
+        # with the files that were not summarised yet.
+        progress_lock = Lock()
+
+        def save_summary(location, summary):
+            with progress_lock:
+                swagger_summaries[location] = summary
+                summary_hashes[location] = metadata_hashes[location]
+                _dump_atomically(swagger_summaries, configuration.metadata_summaries_path)
+                _dump_atomically(summary_hashes, manifest_path)
+
+        _dump_atomically(swagger_summaries, configuration.metadata_summaries_path)
+        _dump_atomically(summary_hashes, manifest_path)
+        engine = SummaryEngine(summarise=lambda prompt: cached_completion(llm, prompt))
+        failures = engine.run(prompts, save_summary)
+        print("LLM cache:", get_llm_cache().stats())
+        self._index_summaries(swagger_summaries)
+        if failures:
+            return (
+                f"""Metadata summaries could not be generated for {", ".join(failures)}. """
+                f"""The other summaries are in the file {configuration.metadata_summaries_path}"""
+            )
 
         return f"""Metadata summaries have been generated successfully. The generated summaries are in the file {configuration.generated_folder_path}/metadata_summaries"""
 
 
+def response_shaper(chunk_file: str = None) -> ResponseShaper:
+    """A ResponseShaper resolving schema "$ref"s from the definitions store next to `chunk_file`."""
+    def resolve(ref):
+        definition_file = join(dirname(chunk_file), DEFINITIONS_FOLDER_NAME, definition_file_name(ref))
+        if not exists(definition_file):
+            return None
+        with open(definition_file, "r") as file:
+            return loads(file.read())
+    return ResponseShaper(resolve if chunk_file else None)
+
+
+@tool("api_response_query")
+def api_response_query(handle: str, query: str = "") -> str:
+    """
+    This function will read part of an API response that was too big to be returned in full by the
+    api_caller tool. It has 2 parameter it accepts:
+    - handle: The handle given with the shortened response
+    - query: The part of the response to read, as a dotted path where list positions are given in
+    brackets and [*] selects every item, for example "items[*].name" or "items[3]". Leave it empty
+    to read the whole response.
+    """
+    try:
+        return dumps(query_response(handle, query))
+    except (ValueError, FileNotFoundError) as e:
+        return str(e)
+
+
+def api_target(overrides: dict) -> tuple:
+    """
+    The `(API_ENDPOINT, API_BEARER_TOKEN)` of the selected API Specification file:
+    those passed to a tool in `overrides` first, then those of the session, then .env.
+    """
+    swagger_file = configuration.selected_swagger_file
+    endpoints = dict(configuration.api_endpoints)
+    tokens = dict(configuration.api_bearer_tokens)
+    if "API_ENDPOINT" in overrides:
+        endpoints[swagger_file] = overrides["API_ENDPOINT"]
+    if "API_BEARER_TOKEN" in overrides:
+        tokens[swagger_file] = overrides["API_BEARER_TOKEN"]
+    return resolve_api_target(swagger_file, endpoints, tokens)
+
+
+def flatten_body(parameters: dict) -> dict:
+    """Lifts the keys of a nested "body" parameter to the top level, as the tools expect flat parameters."""
+    if "body" in parameters:
+        for key, value in parameters["body"].items():
+            parameters[key] = value
+        del parameters["body"]
+    return parameters
+
+
 class APICaller(BaseTool):
     """
     This tool accepts a very specific input and makes API calls.
@@ -230,6 +396,11 @@ class APICaller(BaseTool):
             "**kwargs": Extra arguments that might be necessary to make the API call, such as 
             "API_ENDPOINT" and "API_BEARER_TOKEN"
         ```
+        GET calls to paginated list endpoints return the items of all pages at once, as
+        {"items": [...], "count": ..., "pages": ..., "complete": ...}. Pass the page token parameter
+        explicitly to fetch a single page instead.
+        Responses that are too big are shortened, long lists being replaced by {"count": ..., "sample": [...]},
+        and come with a "handle" with which the full response can be read using the api_response_query tool.
         """
     )
 
@@ -244,21 +415,14 @@ class APICaller(BaseTool):
             f"{configuration.diagram_path}/{configuration.diagrams['api_caller']}"
         )
         print("The parameters received are:", path, "\n", method, "\n", parameters, "\n", args, "\n", kwargs)
-        load_dotenv(find_dotenv(), override=True)
-        base_url = kwargs.get("API_ENDPOINT") if "API_ENDPOINT" in kwargs else \
-        loads(environ.get("API_ENDPOINT").replace("'", '"'))[configuration.selected_swagger_file]
+        # endpoint and token passed to the tool, entered in this session, or else read from .env once and cached
+        base_url, bearer_token = api_target(kwargs)
         base_url = base_url.rstrip("/")
         url = base_url + path
 
         # taking care of edge cases
-        if "body" in parameters:
-            for key, value in parameters["body"].items():
-                parameters[key] = value
-            del parameters["body"]
-
-        bearer_token = kwargs.get("API_BEARER_TOKEN") if "API_BEARER_TOKEN" in kwargs else \
-        loads(environ.get("API_BEARER_TOKEN").replace("'", '"'))[configuration.selected_swagger_file]
-        
+        parameters = flatten_body(parameters)
+
         headers = {"Authorization": f"Bearer {bearer_token}"}
 
         call_details = f"""Making request to: {url} with parameters: {parameters} and headers: {headers}"""
@@ -272,23 +436,95 @@ class APICaller(BaseTool):
             avatar=pn.pane.Image(f"{configuration.diagram_path}/tool.svg", styles={"margin-top": "1rem", "padding": "1.5rem"})
         )
 
+        # pooled keep-alive session per target API
+        client = get_api_client(base_url)
+        chunk_file, operation = find_path_operation(
+            configuration.generated_folder_path, configuration.selected_swagger_file, path, method
+        )
+        schema = response_schema(operation)
         if method.upper() == "GET":
-            response = get(url, params=parameters, headers=headers, verify=False)
-        elif method.upper() == "POST":
-            response = post(url, json=parameters, headers=headers, verify=False)
-        elif method.upper() == "PATCH":
-            response = patch(url, json=parameters, headers=headers, verify=False)
-        elif method.upper() == "DELETE":
-            response = delete(url, json=parameters, headers=headers, verify=False)
-        else:
-            raise ValueError("Unsupported HTTP method")
+            paging = pagination_parameters(operation)
+            if paging and paging["token"] not in parameters:
+                pages = iter_pages(lambda page: client.request(method, path, page, headers), parameters, paging)
+                aggregate = collect_pages(pages, paging)
+                return shape_response(aggregate, aggregate_schema(schema, aggregate), response_shaper(chunk_file))
+
+        response = client.request(method, path, parameters, headers)
 
         if response.ok:
-            return response.json()
+            return shape_response(response.json(), schema, response_shaper(chunk_file))
         else:
             return response._content.decode("utf-8")
 
 
+class APIBatchCaller(BaseTool):
+    """
+    This tool accepts a list of API calls and makes them concurrently.
+    """
+
+    name: str = "api_batch_caller"
+    description: str = (
+        """This tool is meant to make several independent API calls at once, for example fetching the details of
+        every project in a list. The tool accepts inputs in the following format:
+        ```
+            "calls": A list of API calls, each of the form {"path": ..., "method": ..., "parameters": {...}}
+            with the same meaning as the inputs of the api_caller tool,
+            "**kwargs": Extra arguments that might be necessary to make the API calls, such as
+            "API_ENDPOINT" and "API_BEARER_TOKEN"
+        ```
+        It returns one result per call in the same order, each with its "status" and either the "response"
+        or the "error", so the calls that failed can be retried on their own.
+        """
+    )
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def __init__(self):
+        super().__init__()
+
+    def _run(self, calls: List[Dict[str, Any]], *args, **kwargs):
+        configuration.active_diagram.value = (
+            f"{configuration.diagram_path}/{configuration.diagrams['api_caller']}"
+        )
+        base_url, bearer_token = api_target(kwargs)
+        headers = {"Authorization": f"Bearer {bearer_token}"}
+        for call in calls:
+            call["parameters"] = flatten_body(call.get("parameters") or {})
+
+        call_details = "\n".join(
+            f"- {call.get('method', '').upper()} {base_url.rstrip('/')}{call.get('path', '')} with parameters: {call['parameters']}"
+            for call in calls
+        )
+        configuration.chat_interface.send(
+            value=pn.pane.Markdown(
+                object=f"Making {len(calls)} requests:\n{call_details}",
+                styles=configuration.chat_styles,
+                stylesheets=[chat_stylesheet]
+            ), user="API Caller Tool",
+            respond=False,
+            avatar=pn.pane.Image(f"{configuration.diagram_path}/tool.svg", styles={"margin-top": "1rem", "padding": "1.5rem"})
+        )
+
+        results = call_batch(base_url, calls, headers)
+        for result in results:
+            if result["ok"]:
+                chunk_file, operation = find_path_operation(
+                    configuration.generated_folder_path, configuration.selected_swagger_file,
+                    result["path"], result["method"]
+                )
+                result["response"] = shape_response(
+                    result["response"], response_schema(operation), response_shaper(chunk_file)
+                )
+        failed = [result["index"] for result in results if not result["ok"]]
+        return {
+            "succeeded": len(results) - len(failed),
+            "failed": failed,
+            "results": results,
+        }
+
+
 # swagger_splitter = SwaggerSplitter()
 summary_generator = SummaryGenerator()
 api_caller = APICaller()
+api_batch_caller = APIBatchCaller()
@@ -1,4 +1,4 @@
-from .config import configuration, Initialize
+from .config import configuration, Initialize, SessionConfiguration
 
 
-__all__ = ["configuration", "Initialize"]
+__all__ = ["configuration", "Initialize", "SessionConfiguration"]
@@ -1,11 +1,15 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
 from os.path import join
 from os import environ
+from typing import Dict
 from aiagents.custom_threading import threads
+from aiagents.custom_threading.handoff import HumanInputChannel
 
 from dotenv import load_dotenv, find_dotenv
 
-from langchain_openai import AzureChatOpenAI, ChatOpenAI
 import panel as pn
 
 
@@ -44,11 +48,27 @@ class Initialize:
             self.generated_folder_path, "summaries", "metadata_summaries"
         )
         self.openai_provider = "AZURE_OPENAI"
+        # bumped whenever the LLM is rebuilt, so the crews built on the previous one are dropped
+        self.version = 0
         self.selected_swagger_file = ""
-        self.user_input = None
+        self.human_input = HumanInputChannel()
         self.first_run = pn.Param.param
         self.current_agent = "" 
         self.new_file_name = ""
+        # the parsed document and content hash of the file being uploaded, when validation produced them
+        self.new_file_document = None
+        self.new_file_hash = None
+        # the number of files uploaded in this session, the first one starts the interaction crew
+        self.file_count = 0
+
+        # credentials entered in this session, used instead of those of the .env file
+        self.openai_api_key: str = None
+        self.azure_deployment: str = None
+        self.azure_embedding_deployment: str = None
+        self.azure_endpoint: str = None
+        # API endpoint and bearer token of each API Specification file uploaded in this session
+        self.api_endpoints: Dict[str, str] = {}
+        self.api_bearer_tokens: Dict[str, str] = {}
 
         self.sidebar: pn.Column = None
         self.metadata_summarization_status = pn.widgets.TextInput(value="")
@@ -77,32 +97,112 @@ class Initialize:
             "min-height": "2.5rem",
             "border": "0.05rem solid #c0caca",
         }
-        self.initialization_crew_thread: threads.thread_with_trace = None
-        self.crew_thread: threads.thread_with_trace = None
+        self.initialization_crew_thread: threads.CrewWorker = None
+        self.crew_thread: threads.CrewWorker = None
         self.upload_button: pn.widgets.Button = None
 
+    def chat_model(self, **kwargs):
+        """
+        A chat model of the selected OpenAI provider, with the credentials entered in
+        this session, or else those of the environment.
+        """
+        # imported here, the UI is served before the langchain stack has been loaded
+        from langchain_openai import AzureChatOpenAI, ChatOpenAI
+
+        if self.openai_api_key:
+            kwargs["api_key"] = self.openai_api_key
+        if self.openai_provider != "AZURE_OPENAI":
+            return ChatOpenAI(**kwargs)
+        if self.azure_endpoint:
+            kwargs["azure_endpoint"] = self.azure_endpoint
+        return AzureChatOpenAI(
+            azure_deployment=self.azure_deployment or environ.get("AZURE_OPENAI_DEPLOYMENT", "cml"), **kwargs
+        )
+
     def update_configuration(self):
-        load_dotenv(find_dotenv(), override=True)
+        load_dotenv(find_dotenv())
 
         print("openai provider:", self.openai_provider)
     
-        self.llm = AzureChatOpenAI(azure_deployment=environ.get(
-            "AZURE_OPENAI_DEPLOYMENT", "cml"
-        )) if self.openai_provider == "AZURE_OPENAI" else ChatOpenAI()
+        self.llm = self.chat_model()
         self.llm.temperature = float(environ.get("LLM_TEMPERATURE", 0.25))
+        self.version += 1
         print("LLM temperature: ", self.llm.temperature)
 
     def update_config_upload(self):
-        load_dotenv(find_dotenv(), override=True)
+        load_dotenv(find_dotenv())
 
         print("openai provider:", self.openai_provider)
     
-        self.llm = AzureChatOpenAI(azure_deployment=environ.get(
-            "AZURE_OPENAI_DEPLOYMENT", "cml"
-        )) if self.openai_provider == "AZURE_OPENAI" else ChatOpenAI()
+        self.llm = self.chat_model()
         self.llm.temperature = float(environ.get("LLM_TEMPERATURE", 0.25))
+        self.version += 1
         print("LLM temperature: ", self.llm.temperature)
 
 
+_used: ContextVar = ContextVar("configuration", default=None)
+
+
+class SessionConfiguration:
+    """
+    Stands in for the Initialize of the session at hand, so that every browser
+    session served by one process has its own chat, widgets, crew threads and LLM.
+    Attribute access is forwarded to, in order: the Initialize a crew thread was
+    started for or that `use` binds, the one registered for the Bokeh session whose
+    callback is running, and otherwise a process wide default, e.g. for the upload API.
+    """
+
+    def __init__(self, default: Initialize) -> None:
+        object.__setattr__(self, "_default", default)
+        object.__setattr__(self, "_sessions", {})
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    @property
+    def sessions(self) -> Dict[str, Initialize]:
+        return dict(self._sessions)
+
+    def _session_id(self):
+        document = pn.state.curdoc
+        context = getattr(document, "session_context", None) if document is not None else None
+        return getattr(context, "id", None)
+
+    def current(self) -> Initialize:
+        bound = getattr(threading.current_thread(), "configuration", None) or _used.get()
+        if bound is not None:
+            return bound
+        session_id = self._session_id()
+        if session_id is not None:
+            with self._lock:
+                if session_id in self._sessions:
+                    return self._sessions[session_id]
+        return self._default
+
+    def register(self, session: Initialize, session_id: str = None) -> Initialize:
+        """Binds `session` to the Bokeh session being built, it is dropped when that session is destroyed."""
+        session_id = session_id or self._session_id()
+        with self._lock:
+            self._sessions[session_id] = session
+        return session
+
+    @contextmanager
+    def use(self, session: Initialize):
+        """Resolves to `session` within the block, for code run on behalf of a session outside its callbacks."""
+        token = _used.set(session)
+        try:
+            yield session
+        finally:
+            _used.reset(token)
+
+    def unregister(self, session_id: str) -> Initialize:
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def __getattr__(self, name):
+        return getattr(self.current(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.current(), name, value)
+
+
 global configuration
-configuration = Initialize()
+configuration = SessionConfiguration(Initialize())
@@ -1,3 +1,12 @@
-from .crew import *
+from aiagents.lazy_imports import lazy_exports
 
-__all__ = ["StartCrew"]
+__all__ = [
+    "StartCrewInitialization",
+    "StartCrewInteraction",
+    "create_session_without_start_button",
+    "ingest_specification",
+    "reset_for_new_input",
+    "session_created",
+]
+
+__getattr__ = lazy_exports(__name__, {name: ".crew" for name in __all__})
@@ -1,18 +1,18 @@
 from os import environ, listdir
 import os
 import shutil
+from typing import Callable
 from aiagents.custom_threading import threads
 from aiagents.config import configuration
 from crewai import Crew
-from dotenv import find_dotenv, get_key, load_dotenv, set_key
 import panel as pn
 from bokeh.server.contexts import BokehSessionContext
-from aiagents.cml_agents.manager_agents import ManagerAgents
 from aiagents.cml_agents.swagger_splitter import SwaggerSplitterAgents
-from aiagents.cml_agents.agents import Agents
 from aiagents.cml_agents.parse_for_manager import swagger_parser
-from aiagents.cml_agents.callback_utils import custom_callback, custom_initialization_callback
-from aiagents.cml_agents.tasks import Tasks, TasksInitialize
+from aiagents.cml_agents.routing import human_answer, read_summaries, route_spec, swagger_file_name
+from aiagents.cml_agents.callback_utils import custom_initialization_callback
+from aiagents.cml_agents.tasks import TasksInitialize
+from aiagents.crew.factory import crew_factory, embedder_config
 
 from aiagents.config import Initialize, configuration
 from aiagents.custom_threading import threads
@@ -20,11 +20,56 @@ from aiagents.custom_threading import threads
 from aiagents.panel_utils.panel_stylesheets import chat_stylesheet
 
 
+def ingest_specification(
+    configuration: Initialize,
+    file_name: str,
+    progress: Callable[[str], None] = None,
+    document: dict = None,
+    source_hash: str = None,
+):
+    """
+    Splits the uploaded API Specification file `file_name` and has the metadata of
+    every file summarised. `progress` is told the stage being entered: "parsing",
+    then "summarising". Failures are raised to the caller. A `document` parsed
+    during the upload, and its `source_hash`, spare swagger_parser reading the file.
+    """
+    progress = progress or (lambda stage: None)
+    if file_name in listdir(configuration.swagger_files_directory):
+        progress("parsing")
+        swagger_parser(
+            file_name,
+            configuration.swagger_files_directory,
+            configuration.generated_folder_path,
+            document=document,
+            source_hash=source_hash,
+        )
+    swagger_splitter_agents = SwaggerSplitterAgents(configuration=configuration)
+    agent_dict = {
+        "metadata_summarizer_agent": swagger_splitter_agents.metadata_summarizer_agent,
+    }
+    tasks = TasksInitialize(configuration=configuration, agents=agent_dict)
+    embedding = embedder_config(configuration)
+
+    splitterCrew = Crew(
+        agents=[
+            agent_dict["metadata_summarizer_agent"],
+        ],
+        tasks=[
+            tasks.metadata_summarizer_task,
+        ],
+        verbose=1,
+        memory=False,
+        embedder=embedding,
+        task_callback=custom_initialization_callback
+    )
+    progress("summarising")
+    splitterCrew.kickoff()
+
+
 # we can't directly import the agents and tasks because we want to ensure that the configuration is first
 # initialize the configuration with panel hooks, and then pass it as an argument
 def StartCrewInitialization(configuration: Initialize):
     #manager_agents = ManagerAgents(configuration=configuration)
-    swagger_splitter_agents = SwaggerSplitterAgents(configuration=configuration)
     #agents = Agents(configuration=configuration)
     ##please call swagger splitter here
 
@@ -37,13 +82,8 @@ def StartCrewInitialization(configuration: Initialize):
     #     # Recreate the empty directory
     #     os.makedirs(configuration.generated_folder_path)
 
-    env_file = find_dotenv()
-    load_dotenv(env_file)
-    file_count = get_key(env_file, "fileCount")
-    try:
-        file_count = int(file_count)
-    except:
-        file_count = 0
+    # the number of files this session has uploaded, the first one starts its interaction crew
+    file_count = configuration.file_count
     if file_count >= 1:
         configuration.metadata_summarization_status.value = (
             f"Processing the API Specification file {configuration.new_file_name} ⏱" 
@@ -63,58 +103,13 @@ def StartCrewInitialization(configuration: Initialize):
         configuration.initialization_spinner.visible = True
         configuration.initialization_spinner.value = True
 
-    for filename in listdir(configuration.swagger_files_directory):
-            if filename == configuration.new_file_name:
-                swagger_parser(
-                    filename,
-                    configuration.swagger_files_directory,
-                    configuration.generated_folder_path,
-                )
-    agent_dict = {
-        "metadata_summarizer_agent": swagger_splitter_agents.metadata_summarizer_agent,
-    }
-    tasks = TasksInitialize(configuration=configuration, agents=agent_dict)
-    embedding = {
-        "provider": "azure_openai",
-        "config": {
-            "model": environ.get(
-                "OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002"
-            ),
-            "deployment_name": environ.get(
-                "AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "ada-embedding"
-            ),
-        },
-    } if configuration.openai_provider=="AZURE_OPENAI" else {
-        "provider": "openai",
-        "config": {
-            "model": environ.get(
-                "OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002"
-            )
-        },
-    }
-
-    splitterCrew = Crew(
-        agents=[
-            agent_dict["metadata_summarizer_agent"],
-        ],
-        tasks=[
-            tasks.metadata_summarizer_task,
-        ],
-        verbose=1,
-        memory=False,
-        embedder=embedding,
-        task_callback=custom_initialization_callback
-    )
     try:
         configuration.processing_file = True
-        splitterCrew.kickoff()
-        env_file = find_dotenv()
-        load_dotenv(env_file)
-        file_count = get_key(env_file, "fileCount")
-        try:
-            file_count = int(file_count)
-        except:
-            file_count = 0
+        document, configuration.new_file_document = configuration.new_file_document, None
+        ingest_specification(
+            configuration, configuration.new_file_name, document=document, source_hash=configuration.new_file_hash
+        )
+        file_count = configuration.file_count
         if file_count == 0:
             configuration.chat_interface.send(
                 pn.pane.Markdown(
@@ -131,18 +126,12 @@ def StartCrewInitialization(configuration: Initialize):
             session_created()
         else:
             configuration.metadata_summarization_status.value = f"Processed the API Specification File {configuration.new_file_name}"
-        file_count += 1
-        set_key(env_file, 'fileCount',str(file_count))
+        configuration.file_count = file_count + 1
         configuration.processing_file = False
         if not configuration.empty_inputs:
             configuration.upload_button.disabled = False
     except Exception as err:
-        load_dotenv(env_file)
-        file_count = get_key(env_file, "fileCount")
-        try:
-            file_count = int(file_count)
-        except:
-            file_count = 0
+        file_count = configuration.file_count
         if file_count == 0:
             configuration.chat_interface.send(
                 pn.pane.Markdown(
@@ -169,59 +158,24 @@ def StartCrewInitialization(configuration: Initialize):
 
 
 def StartCrewInteraction(configuration: Initialize):
-    manager_agents = ManagerAgents(configuration=configuration)
-    agents = Agents(configuration=configuration)
-
-
-
-    agent_dict = {
-        "task_matching_agent": manager_agents.task_matching_agent,
-        "manager_agent": manager_agents.manager_agent,
-        "human_input_agent": agents.human_input_agent,
-        "validator_agent": agents.validator_agent,
-    }
-
-    tasks = Tasks(configuration=configuration, agents=agent_dict)
-
-    embedding = {
-        "provider": "azure_openai",
-        "config": {
-            "model": environ.get(
-                "OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002"
-            ),
-            "deployment_name": environ.get(
-                "AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "ada-embedding"
-            ),
-        },
-    } if configuration.openai_provider=="AZURE_OPENAI" else {
-        "provider": "openai",
-        "config": {
-            "model": environ.get(
-                "OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002"
-            )
-        },
-    }
-
-    splitterCrew = Crew(
-        agents=[
-            agent_dict["task_matching_agent"],
-            agent_dict["manager_agent"],
-            agent_dict["human_input_agent"],
-            agent_dict["validator_agent"],
-        ],
-        tasks=[
-            tasks.initial_human_input_task,
-            tasks.task_matching_task,
-            tasks.manager_task,
-        ],
-        verbose=1,
-        memory=False,
-        embedder=embedding,
-        task_callback=custom_callback
-    )
+    # agents, tasks and crews are reused across conversations until the configuration changes
+    interaction = crew_factory.get(configuration)
+    tasks = interaction.tasks
 
     try:
-        splitterCrew.kickoff()
+        # The user's request is gathered first, so that the API Specification file can be
+        # picked without the Input Matcher agent whenever the choice is not ambiguous.
+        request = human_answer(interaction.prepare(interaction.human_input_crew).kickoff())
+        decision = route_spec(read_summaries(configuration.metadata_summaries_path), request)
+        if decision:
+            configuration.selected_swagger_file = swagger_file_name(decision["file_location"])
+            tasks.route_to(decision)
+            print(f"Routed to {decision['file_name']} without the Input Matcher: {decision['reason']}")
+            splitterCrew = interaction.routed_crew
+        else:
+            splitterCrew = interaction.matching_crew
+
+        interaction.prepare(splitterCrew).kickoff()
 
         configuration.chat_interface.send(
             pn.pane.Markdown(
@@ -233,10 +187,6 @@ def StartCrewInteraction(configuration: Initialize):
             respond=False,
             avatar=pn.pane.Image(f"{configuration.diagram_path}/system.svg", styles={"margin-top": "1rem", "padding": "1.5rem"})
         )
-        reset_for_new_input()
-        configuration.spinner.value = False
-        configuration.spinner.visible = False
-    
     except Exception as err:
         configuration.chat_interface.send(
             pn.pane.Markdown(
@@ -252,6 +202,14 @@ def StartCrewInteraction(configuration: Initialize):
         configuration.spinner.visible=False
         configuration.spinner.value=False
         configuration.reload_button.disabled=False
+        return
+    finally:
+        # the crew is free again before the next conversation, started below, asks for it
+        crew_factory.release(interaction)
+
+    # The next conversation's crew thread takes over the session's UI from here,
+    # this thread hands over as its very last step and touches nothing after it.
+    reset_for_new_input()
 
 
 
@@ -269,8 +227,9 @@ def session_created():
     # Show the loading spinner as the Crew loads
     configuration.spinner.value = True
     configuration.spinner.visible = True
-    configuration.crew_thread = threads.thread_with_trace(
-        target=StartCrewInteraction, args=(configuration,)
+    session = configuration.current()
+    configuration.crew_thread = threads.CrewWorker(
+        target=StartCrewInteraction, args=(session,), configuration=session
     )
     configuration.crew_thread.daemon = True  # Ensure the thread dies when the main thread (the one that created it) dies
     configuration.crew_thread.start()
@@ -308,8 +267,9 @@ def create_session_without_start_button():
     # Show the loading spinner as the Crew loads
     configuration.spinner.value = True
     configuration.spinner.visible = True
-    configuration.crew_thread = threads.thread_with_trace(
-        target=StartCrewInteraction, args=(configuration,)
+    session = configuration.current()
+    configuration.crew_thread = threads.CrewWorker(
+        target=StartCrewInteraction, args=(session,), configuration=session
     )
     configuration.crew_thread.daemon = True  # Ensure the thread dies when the main thread (the one that created it) dies
     configuration.crew_thread.start()
@@ -326,6 +286,7 @@ def reset_for_new_input():
     except:
         print("Not able to kill the thread")
         pass
+    configuration.human_input.cancel()
     configuration.reload_button.disabled = True
     configuration.spinner.visible = False
     configuration.spinner.value = False
@@ -0,0 +1,151 @@
+from os import environ
+from threading import Lock, Thread, current_thread
+from typing import Optional
+from weakref import WeakKeyDictionary
+
+from crewai import Crew
+from crewai.agents.cache import CacheHandler
+
+from aiagents.cml_agents.agents import Agents
+from aiagents.cml_agents.callback_utils import custom_callback
+from aiagents.cml_agents.manager_agents import ManagerAgents
+from aiagents.cml_agents.tasks import Tasks
+from aiagents.config import Initialize, SessionConfiguration
+
+
+def embedder_config(configuration: Initialize) -> dict:
+    """The embedder settings of the crews, for the configured OpenAI provider and the session's credentials."""
+    if configuration.openai_provider == "AZURE_OPENAI":
+        config = {
+            "model": environ.get(
+                "OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002"
+            ),
+            "deployment_name": configuration.azure_embedding_deployment or environ.get(
+                "AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "ada-embedding"
+            ),
+        }
+        if configuration.openai_api_key:
+            config["api_key"] = configuration.openai_api_key
+        return {"provider": "azure_openai", "config": config}
+    config = {
+        "model": environ.get(
+            "OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002"
+        )
+    }
+    if configuration.openai_api_key:
+        config["api_key"] = configuration.openai_api_key
+    return {"provider": "openai", "config": config}
+
+
+class InteractionCrew:
+    """
+    The agents, tasks and crews of the interaction flow, built once per configuration
+    version. `reset` clears what a conversation leaves behind, so the same objects
+    serve the next conversation. `holder` is the crew thread using it, if any.
+    """
+
+    def __init__(self, configuration: Initialize) -> None:
+        self.version = configuration.version
+        self.holder: Optional[Thread] = None
+        manager_agents = ManagerAgents(configuration=configuration)
+        agents = Agents(configuration=configuration)
+        self.agents = {
+            "task_matching_agent": manager_agents.task_matching_agent,
+            "manager_agent": manager_agents.manager_agent,
+            "human_input_agent": agents.human_input_agent,
+            "validator_agent": agents.validator_agent,
+        }
+        self.tasks = Tasks(configuration=configuration, agents=self.agents)
+        embedding = embedder_config(configuration)
+
+        self.human_input_crew = Crew(
+            agents=[self.agents["human_input_agent"]],
+            tasks=[self.tasks.initial_human_input_task],
+            verbose=1,
+            memory=False,
+            embedder=embedding,
+            task_callback=custom_callback
+        )
+        all_agents = [
+            self.agents["task_matching_agent"],
+            self.agents["manager_agent"],
+            self.agents["human_input_agent"],
+            self.agents["validator_agent"],
+        ]
+        self.matching_crew = Crew(
+            agents=all_agents,
+            tasks=[self.tasks.task_matching_task, self.tasks.manager_task],
+            verbose=1,
+            memory=False,
+            embedder=embedding,
+            task_callback=custom_callback
+        )
+        self.routed_crew = Crew(
+            agents=all_agents,
+            tasks=[self.tasks.manager_task],
+            verbose=1,
+            memory=False,
+            embedder=embedding,
+            task_callback=custom_callback
+        )
+
+    def prepare(self, crew: Crew) -> Crew:
+        """
+        Gives `crew` a fresh tool cache before it is kicked off. The crews share their
+        agents, which would otherwise keep the cache, and the answers, of an earlier run.
+        """
+        crew._cache_handler = CacheHandler()
+        for agent in crew.agents:
+            agent.set_cache_handler(crew._cache_handler)
+        return crew
+
+    def reset(self):
+        self.tasks.reset()
+
+    def in_use(self) -> bool:
+        """Whether another crew thread, e.g. one killed by a restart that has not ended yet, still runs it."""
+        return self.holder is not None and self.holder is not current_thread() and self.holder.is_alive()
+
+
+class CrewFactory:
+    """
+    Hands out the InteractionCrew of a session, rebuilding it when the session's
+    configuration changes. Sessions never share agents, whose LLM, callbacks and
+    tool cache belong to one conversation; a crew is dropped with its session.
+
+    The crew is handed to one crew thread at a time, until `release`. A thread
+    asking while the crew is still held, e.g. after a restart killed the previous
+    thread but before it ended, gets a fresh crew instead of sharing its tasks.
+    """
+
+    def __init__(self) -> None:
+        self._crews = WeakKeyDictionary()
+        self._lock = Lock()
+
+    def get(self, configuration: Initialize) -> InteractionCrew:
+        session = configuration.current() if isinstance(configuration, SessionConfiguration) else configuration
+        with self._lock:
+            crew = self._crews.get(session)
+            if crew is None or crew.version != session.version or crew.in_use():
+                crew = self._crews[session] = InteractionCrew(session)
+            else:
+                crew.reset()
+            crew.holder = current_thread()
+            return crew
+
+    def release(self, crew: InteractionCrew):
+        """Hands `crew` back once the running thread is done with it."""
+        with self._lock:
+            if crew.holder is current_thread():
+                crew.holder = None
+
+    def invalidate(self, configuration: Initialize = None):
+        with self._lock:
+            if configuration is None:
+                self._crews.clear()
+            else:
+                session = configuration.current() if isinstance(configuration, SessionConfiguration) else configuration
+                self._crews.pop(session, None)
+
+
+crew_factory = CrewFactory()
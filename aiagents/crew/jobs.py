@@ -0,0 +1,123 @@
+from os import environ
+from threading import Lock
+from time import time
+from typing import Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from aiagents.custom_threading.threads import CrewPool, CrewWorker
+
+
+class IngestionJob:
+    """
+    One uploaded API Specification file on its way through the ingestion pipeline.
+    `status` is "queued", "running", "succeeded" or "failed"; `stage` is the step
+    the pipeline is at, and `stages` records when each step was entered.
+    """
+
+    def __init__(self, file_name: str, digest: str, document: dict = None) -> None:
+        self.id = uuid4().hex
+        self.file_name = file_name
+        self.digest = digest
+        # the document parsed during the upload, released once the job has run
+        self.document = document
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.created = time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.stages: List[Tuple[str, float]] = [("queued", self.created)]
+        self.worker: Optional[CrewWorker] = None
+
+    @property
+    def stage(self) -> str:
+        return self.stages[-1][0]
+
+    def update(self, stage: str):
+        self.stages.append((stage, time()))
+
+    def status_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "file_name": self.file_name,
+            "status": self.status,
+            "stage": self.stage,
+            "error": self.error,
+        }
+
+    def progress_dict(self) -> dict:
+        end = self.finished or time()
+        return {
+            **self.status_dict(),
+            "elapsed_seconds": round(end - self.created, 3),
+            "stages": [
+                {"stage": stage, "seconds": round(until - entered, 3)}
+                for (stage, entered), until in zip(
+                    self.stages, [entered for _, entered in self.stages[1:]] + [end]
+                )
+            ],
+        }
+
+
+class IngestionQueue:
+    """
+    Runs ingestion jobs in the background, at most `max_workers` (INGESTION_WORKERS,
+    2 by default) at a time, the others wait in line. Uploads of a file whose name
+    and content are already queued, running or ingested are given the existing job
+    instead of a new one; the same content under another name is a file of its own.
+    A file whose job failed can be submitted again.
+    """
+
+    def __init__(self, run: Callable[[IngestionJob], None], max_workers: int = None) -> None:
+        self.run = run
+        self.pool = CrewPool(max_workers or int(environ.get("INGESTION_WORKERS", "2")))
+        self.jobs: Dict[str, IngestionJob] = {}
+        self._by_content: Dict[Tuple[str, str], IngestionJob] = {}
+        self._lock = Lock()
+
+    def submit(
+        self, file_name: str, digest: str, prepare: Callable[[], None] = None, document: dict = None
+    ) -> Tuple[IngestionJob, bool]:
+        """
+        Returns the job of `file_name` with content hash `digest` and whether it was created
+        by this call. `prepare`, e.g. saving the file, only runs for a new job,
+        before it is queued. A parsed `document` is kept on the job for its run.
+        """
+        with self._lock:
+            existing = self._by_content.get((file_name, digest))
+            if existing is not None and existing.status != "failed":
+                return existing, False
+            job = IngestionJob(file_name, digest, document)
+            self.jobs[job.id] = job
+            self._by_content[(file_name, digest)] = job
+        try:
+            if prepare:
+                prepare()
+        except Exception as e:
+            job.document = None
+            self._finish(job, "failed", str(e))
+            raise
+        job.worker = CrewWorker(target=self._run, args=(job,), pool=self.pool, daemon=True)
+        job.worker.start()
+        return job, True
+
+    def _run(self, job: IngestionJob):
+        job.status = "running"
+        job.started = time()
+        job.update("running")
+        try:
+            self.run(job)
+        except Exception as e:
+            self._finish(job, "failed", str(e))
+        else:
+            self._finish(job, "succeeded")
+        finally:
+            job.document = None
+
+    def _finish(self, job: IngestionJob, status: str, error: str = None):
+        job.status = status
+        job.error = error
+        job.update(status)
+        job.finished = job.stages[-1][1]
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(job_id)
@@ -0,0 +1,115 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from os import environ
+from typing import Callable
+
+
+class CrewCancelled(SystemExit):
+    """
+    Raised in a crew thread once its token is cancelled. It derives from SystemExit,
+    so the `except Exception` handlers of crewai, langchain and the tools let it
+    through, and the thread ends without a traceback.
+    """
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation of a crew thread. The UI thread calls `cancel`; the
+    crew thread checks the token at its boundaries (agent steps, LLM and tool calls)
+    and blocking waits register a callback with `on_cancel` to be woken right away.
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise CrewCancelled("The crew was cancelled")
+
+    def wait(self, timeout: float = None) -> bool:
+        """Sleeps until the token is cancelled or `timeout` passes, returns whether it was cancelled."""
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Runs `callback` when the token is cancelled, at once if it already is.
+        Returns a function that unregisters the callback.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def run(self, function: Callable, *args, **kwargs):
+        """
+        Calls `function` on a helper thread and waits for it or for the token,
+        whichever comes first, so a blocking call such as an HTTP request does not
+        hold the crew thread after it was cancelled. The abandoned call finishes,
+        or times out, on its own, and keeps its helper thread until then: `function`
+        should carry a timeout of its own, or abandoned calls can take up all of the
+        CANCELLABLE_CALL_WORKERS helpers and later calls queue behind them.
+        """
+        self.raise_if_cancelled()
+        future = _blocking_calls.submit(function, *args, **kwargs)
+        woken = threading.Event()
+        future.add_done_callback(lambda _: woken.set())
+        unregister = self.on_cancel(woken.set)
+        try:
+            woken.wait()
+        finally:
+            unregister()
+        if not future.done():
+            future.cancel()
+            self.raise_if_cancelled()
+        return future.result()
+
+
+class _NoCancellation(CancellationToken):
+    """The token of threads that are not crew workers: never cancelled, `run` calls directly."""
+
+    def cancel(self):
+        pass
+
+    def run(self, function: Callable, *args, **kwargs):
+        return function(*args, **kwargs)
+
+
+# The helper threads of `CancellationToken.run`, shared by every crew thread of the
+# process. A cancelled call is abandoned, not interrupted: it holds its helper until
+# it returns, the pool is sized for the crews' concurrent calls plus such stragglers.
+_blocking_calls = ThreadPoolExecutor(
+    max_workers=int(environ.get("CANCELLABLE_CALL_WORKERS", "32")), thread_name_prefix="cancellable-call"
+)
+_no_cancellation = _NoCancellation()
+
+
+def current_token() -> CancellationToken:
+    """The cancellation token of the running crew thread, or one that is never cancelled."""
+    return getattr(threading.current_thread(), "token", None) or _no_cancellation
+
+
+def check_cancelled():
+    """Ends the running crew thread with CrewCancelled if it was cancelled."""
+    current_token().raise_if_cancelled()
@@ -0,0 +1,80 @@
+import threading
+from time import monotonic
+
+from .cancellation import CancellationToken, current_token
+from .threads import idle
+
+
+class HumanInputTimeout(TimeoutError):
+    pass
+
+
+class HumanInputCancelled(Exception):
+    pass
+
+
+class HumanInputChannel:
+    """
+    Rendezvous between the chat callback, which `put`s the user's reply, and the
+    crew thread waiting in `get`. The waiting thread sleeps on a condition and is
+    woken as soon as the reply arrives, the wait times out or it is cancelled.
+    A reply sent while nobody is waiting is kept for the next `get`.
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._value = None
+        self._has_value = False
+        self._generation = 0
+
+    def put(self, value):
+        with self._condition:
+            self._value = value
+            self._has_value = True
+            self._condition.notify_all()
+
+    def _wake(self):
+        with self._condition:
+            self._condition.notify_all()
+
+    def get(self, timeout: float = None, token: CancellationToken = None):
+        """
+        Waits for the next reply. Raises HumanInputTimeout after `timeout` seconds,
+        HumanInputCancelled if `cancel` is called while waiting and CrewCancelled
+        if `token`, by default the one of the crew thread, is cancelled.
+        """
+        token = token or current_token()
+        deadline = None if timeout is None else monotonic() + timeout
+        unregister = token.on_cancel(self._wake)
+        try:
+            # other sessions' crews may run while this one waits for its user
+            with idle():
+                return self._get(deadline, timeout, token)
+        finally:
+            unregister()
+
+    def _get(self, deadline, timeout, token: CancellationToken):
+        with self._condition:
+            generation = self._generation
+            while not self._has_value:
+                token.raise_if_cancelled()
+                if self._generation != generation:
+                    raise HumanInputCancelled("Waiting for the user's reply was cancelled")
+                remaining = None if deadline is None else deadline - monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise HumanInputTimeout(f"No reply from the user within {timeout} seconds")
+                self._condition.wait(remaining)
+            if self._generation != generation:
+                raise HumanInputCancelled("Waiting for the user's reply was cancelled")
+            value = self._value
+            self._value = None
+            self._has_value = False
+            return value
+
+    def cancel(self):
+        """Wakes every waiting thread with HumanInputCancelled and drops any unread reply."""
+        with self._condition:
+            self._generation += 1
+            self._value = None
+            self._has_value = False
+            self._condition.notify_all()
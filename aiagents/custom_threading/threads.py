@@ -1,33 +1,118 @@
-import sys
 import threading
+from contextlib import contextmanager
+from os import environ
 
+from .cancellation import CancellationToken, CrewCancelled
 
-class thread_with_trace(threading.Thread):
-    def __init__(self, *args, **keywords):
+
+class CrewPool:
+    """
+    Bounds the number of crews working at the same time across all sessions, to
+    CREW_MAX_WORKERS by default. A crew queues for a slot before it starts and
+    gives its slot up while it waits for its user, so sessions sitting at a
+    question do not hold back the others. Queued crews can still be cancelled.
+    """
+
+    def __init__(self, max_workers: int = None) -> None:
+        self._max_workers = max_workers
+        self.running = 0
+        self.queued = 0
+        self._condition = threading.Condition()
+
+    @property
+    def max_workers(self) -> int:
+        # read when used, the .env file is loaded after this module is imported
+        return self._max_workers or int(environ.get("CREW_MAX_WORKERS", "8"))
+
+    def _wake(self):
+        with self._condition:
+            self._condition.notify_all()
+
+    def acquire(self, token: CancellationToken):
+        unregister = token.on_cancel(self._wake)
+        try:
+            with self._condition:
+                self.queued += 1
+                try:
+                    while self.running >= self.max_workers:
+                        token.raise_if_cancelled()
+                        self._condition.wait()
+                    token.raise_if_cancelled()
+                    self.running += 1
+                finally:
+                    self.queued -= 1
+        finally:
+            unregister()
+
+    def release(self):
+        with self._condition:
+            self.running -= 1
+            self._condition.notify()
+
+
+crew_pool = CrewPool()
+
+
+class CrewWorker(threading.Thread):
+    """
+    Thread running a crew, stopped cooperatively through its cancellation token.
+    `kill` cancels the token; the crew notices it at the next agent step, LLM or
+    tool call, and waits for the user or an API are woken at once. Nothing is
+    traced, so the crew runs at full speed.
+
+    `configuration` is the session the crew works for, it is what the shared
+    `aiagents.config.configuration` resolves to on this thread. The crew only
+    runs once `pool` has a free slot.
+    """
+
+    def __init__(
+        self, *args, token: CancellationToken = None, configuration=None, pool: CrewPool = crew_pool, **keywords
+    ):
         threading.Thread.__init__(self, *args, **keywords)
-        self.killed = False
-
-    def start(self):
-        self.__run_backup = self.run
-        self.run = self.__run
-        threading.Thread.start(self)
-
-    def __run(self):
-        sys.settrace(self.globaltrace)
-        self.__run_backup()
-        self.run = self.__run_backup
-
-    def globaltrace(self, frame, event, arg):
-        if event == "call":
-            return self.localtrace
-        else:
-            return None
-
-    def localtrace(self, frame, event, arg):
-        if self.killed:
-            if event == "line":
-                raise SystemExit()
-        return self.localtrace
+        self.token = token or CancellationToken()
+        self.configuration = configuration
+        self.pool = pool
+        self._holding = False
+
+    @property
+    def killed(self) -> bool:
+        return self.token.cancelled
+
+    def _acquire(self):
+        self.pool.acquire(self.token)
+        self._holding = True
+
+    def _release(self):
+        if self._holding:
+            self._holding = False
+            self.pool.release()
+
+    def run(self):
+        try:
+            if self.pool is None:
+                threading.Thread.run(self)
+                return
+            self._acquire()
+            try:
+                threading.Thread.run(self)
+            finally:
+                self._release()
+        except CrewCancelled:
+            print(f"{self.name} was cancelled")
 
     def kill(self):
-        self.killed = True
+        self.token.cancel()
+
+
+@contextmanager
+def idle():
+    """Gives the pool slot of the running crew up for the duration of a wait, e.g. for the user's reply."""
+    worker = threading.current_thread()
+    if not isinstance(worker, CrewWorker) or worker.pool is None:
+        yield
+        return
+    worker._release()
+    try:
+        yield
+    finally:
+        worker._acquire()
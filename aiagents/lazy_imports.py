@@ -0,0 +1,20 @@
+from importlib import import_module
+from typing import Dict
+
+
+def lazy_exports(package: str, exports: Dict[str, str]):
+    """
+    Returns a module level `__getattr__` for `package` that imports each of its
+    `{name: module}` exports on first access, so importing the package itself
+    does not pull in crewai, langchain and the rest of the agent stack.
+    """
+
+    def __getattr__(name):
+        if name not in exports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(import_module(exports[name], package), name)
+        # cache on the package, later lookups no longer go through here
+        setattr(import_module(package), name, value)
+        return value
+
+    return __getattr__
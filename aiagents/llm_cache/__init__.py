@@ -0,0 +1,17 @@
+from .cache import (
+    LLMResponseCache,
+    MemoryCacheBackend,
+    SQLiteCacheBackend,
+    cached_completion,
+    get_llm_cache,
+    set_llm_cache,
+)
+
+__all__ = [
+    "LLMResponseCache",
+    "MemoryCacheBackend",
+    "SQLiteCacheBackend",
+    "cached_completion",
+    "get_llm_cache",
+    "set_llm_cache",
+]
@@ -0,0 +1,179 @@
+import sqlite3
+from collections import OrderedDict
+from hashlib import sha256
+from json import dumps
+from os import environ, makedirs
+from os.path import dirname, join
+from threading import Lock
+from time import time
+from typing import Callable, Optional
+
+from langchain.schema import HumanMessage
+
+
+class MemoryCacheBackend:
+    """In-process LRU backend, bounded by the total size of the stored values."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._bytes -= len(self._entries.popitem(last=False)[1])
+
+    def size(self):
+        with self._lock:
+            return len(self._entries), self._bytes
+
+
+class SQLiteCacheBackend:
+    """
+    LRU backend persisted in a local SQLite file, bounded by the total size of the
+    stored values. The least recently read entries are evicted first.
+    """
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        makedirs(dirname(path) or ".", exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT, size INTEGER, accessed REAL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (time(), key)
+            )
+            return row[0]
+
+    def set(self, key: str, value: str):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time()),
+            )
+            total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            while total > self.max_bytes:
+                oldest = self._connection.execute(
+                    "SELECT key, size FROM responses WHERE key != ? ORDER BY accessed LIMIT 1", (key,)
+                ).fetchone()
+                if oldest is None:
+                    break
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (oldest[0],))
+                total -= oldest[1]
+
+    def size(self):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+
+
+class LLMResponseCache:
+    """
+    Content-addressed cache of LLM responses. The key is the hash of the model or
+    deployment, the temperature and the prompt, so identical requests are only
+    sent to the LLM once. Hits and misses are counted for `stats`.
+    """
+
+    def __init__(self, backend) -> None:
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def key(model: str, temperature: float, prompt: str) -> str:
+        return sha256(
+            dumps([model, temperature, prompt], ensure_ascii=False).encode()
+        ).hexdigest()
+
+    def get_or_call(self, model: str, temperature: float, prompt: str, call: Callable[[], str]) -> str:
+        key = self.key(model, temperature, prompt)
+        cached = self.backend.get(key)
+        with self._lock:
+            if cached is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if cached is not None:
+            return cached
+        response = call()
+        self.backend.set(key, response)
+        return response
+
+    def stats(self) -> dict:
+        entries, size = self.backend.size()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """
+    Returns the process wide cache, created on first use from LLM_CACHE_BACKEND
+    ("sqlite" or "memory"), LLM_CACHE_PATH and LLM_CACHE_MAX_MB.
+    """
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            max_bytes = int(float(environ.get("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+            if environ.get("LLM_CACHE_BACKEND", "sqlite") == "memory":
+                backend = MemoryCacheBackend(max_bytes)
+            else:
+                backend = SQLiteCacheBackend(
+                    environ.get(
+                        "LLM_CACHE_PATH",
+                        join(environ.get("PROJECT_ROOT", "."), ".cache", "llm_responses.sqlite"),
+                    ),
+                    max_bytes,
+                )
+            _llm_cache = LLMResponseCache(backend)
+        return _llm_cache
+
+
+def set_llm_cache(cache: LLMResponseCache):
+    """Replaces the process wide cache, e.g. with one using a different backend."""
+    global _llm_cache
+    with _llm_cache_lock:
+        _llm_cache = cache
+
+
+def cached_completion(llm, prompt: str) -> str:
+    """Sends `prompt` as a single human message to a langchain chat model through the cache."""
+    model = getattr(llm, "deployment_name", None) or getattr(llm, "model_name", "")
+    return get_llm_cache().get_or_call(
+        model,
+        llm.temperature,
+        prompt,
+        lambda: llm(messages=[HumanMessage(content=prompt)]).content,
+    )
@@ -1,3 +1,5 @@
-from .panel_utils import *
+from aiagents.lazy_imports import lazy_exports
 
-__all__ = ["init", "InitializePanel"]
+__all__ = ["CustomPanelCallbackHandler", "CustomPanelSidebarHandler", "output_formatter"]
+
+__getattr__ = lazy_exports(__name__, {name: ".panel_utils" for name in __all__})
@@ -1,21 +1,50 @@
 import json
 import re
-import time
+from collections import Counter
 from typing import Optional, Any, Union, List
 from json import dumps
 from re import search
-from os import environ
 from bokeh.server.contexts import BokehSessionContext
-from langchain_openai import AzureChatOpenAI, ChatOpenAI
 from langchain.prompts import PromptTemplate
-from langchain.schema import HumanMessage
 import panel as pn
 from aiagents.custom_threading import threads
 from aiagents.config import configuration
+from aiagents.llm_cache import cached_completion
 from aiagents.panel_utils.panel_stylesheets import card_stylesheet, chat_stylesheet
 
 avatars = {}
 
+possible_roles = [
+    "Human Input Agent",
+    "API Selector Agent",
+    "Decision Validator Agent",
+    "Input Matcher",
+]
+
+
+def match_role(value: str) -> Optional[str]:
+    """Returns the known agent role `value` names, ignoring case and punctuation."""
+    normalized = re.sub(r"[^a-z\s]", "", str(value).lower()).strip()
+    for role in possible_roles:
+        if role.lower() == normalized:
+            return role
+    return None
+
+
+def structured_role(output: str) -> Optional[str]:
+    """
+    Reads the "role" field of the structured task outputs (humanInputOutput,
+    inputMatcherDecision, ...) without asking the LLM.
+    """
+    try:
+        parsed = json.loads(output)
+        if isinstance(parsed, dict) and "role" in parsed:
+            return match_role(parsed["role"])
+    except (TypeError, ValueError):
+        pass
+    role_match = search(r'"role"\s*:\s*"([^"]+)"', output)
+    return match_role(role_match.group(1)) if role_match else None
+
 
 def output_formatter(output: str) -> dict:
     human_prompt = f"""
@@ -34,12 +63,8 @@ def output_formatter(output: str) -> dict:
         role 5 must be returned. So don't try to generate whimsical roles on your own, when in doubt.
         Also, don't just randomly select a role from above. Read the text very thoroughly
     """
-    llm = AzureChatOpenAI(azure_deployment=environ.get(
-        "AZURE_OPENAI_DEPLOYMENT", "cml"
-    ), temperature=0.6) if configuration.openai_provider == "AZURE_OPENAI" else ChatOpenAI()
-    message = HumanMessage(content=human_prompt)
-    response = llm(messages=[message]).content
-    return response
+    llm = configuration.chat_model(temperature=0.6)
+    return cached_completion(llm, human_prompt)
 
 class CustomPanelCallbackHandler(pn.chat.langchain.PanelCallbackHandler):
     """Callback Handler that prints to std out."""
@@ -52,12 +77,32 @@ class CustomPanelCallbackHandler(pn.chat.langchain.PanelCallbackHandler):
         super().__init__(chat_interface)
         self.chat_interface: pn.chat.ChatInterface = chat_interface
         self.agent_name: Optional[str] = None
+        # role of every running chain, so the role is known again when it ends
+        self.chain_roles: dict = {}
+        # how the role of each ended chain was resolved, "llm" being the fallback
+        self.role_resolutions: Counter = Counter()
+
+    def resolve_role(self, output: str, run_id=None) -> Optional[str]:
+        role = structured_role(output)
+        if role:
+            self.role_resolutions["structured"] += 1
+            return role
+        role = match_role(self.chain_roles.get(run_id, ""))
+        if role:
+            self.role_resolutions["chain"] += 1
+            return role
+        self.role_resolutions["llm"] += 1
+        role = match_role(output_formatter(output))
+        total = sum(self.role_resolutions.values())
+        print(f"Role resolution fell back to the LLM {self.role_resolutions['llm']}/{total} times")
+        return role
 
     def on_chain_start(
         self, serialized: dict[str, Any], inputs: dict[str, Any], *args, **kwargs
     ):
         user = serialized["repr"].split("role=")[1].split(",")[0]
         self.agent_name = user
+        self.chain_roles[kwargs.get("run_id")] = user
         configuration.active_diagram.value = (
             f"{configuration.diagram_path}/{configuration.diagrams[user]}"
         )
@@ -71,13 +116,8 @@ class CustomPanelCallbackHandler(pn.chat.langchain.PanelCallbackHandler):
 
     def on_chain_end(self, outputs: dict[str, Any], *args, **kwargs):
         print(dumps(outputs, indent=2))
-        role = re.sub(r"[^a-zA-Z\s]", "", output_formatter(outputs["output"])).strip()
-        possible_roles = [
-            "Human Input Agent",
-            "API Selector Agent",
-            "Decision Validator Agent",
-            "Input Matcher",
-        ]
+        role = self.resolve_role(outputs["output"], kwargs.get("run_id"))
+        self.chain_roles.pop(kwargs.get("run_id"), None)
         if role in possible_roles:
             self.agent_name = role
         if "this output contains the appropriate swagger metadata file to use for the task at hand" in outputs["output"].lower():
@@ -159,7 +199,6 @@ class CustomPanelCallbackHandler(pn.chat.langchain.PanelCallbackHandler):
             respond=False,
             avatar=pn.pane.Image(f"{configuration.avatar_images[user]}", styles={"margin-top": "1rem", "padding": "1.5rem"}),
         )
-        time.sleep(1)
         configuration.spinner.value = True
         configuration.spinner.visible = True
 
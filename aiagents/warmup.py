@@ -0,0 +1,67 @@
+import threading
+from importlib import import_module
+from time import perf_counter
+from typing import Callable, Dict, Optional
+
+# The modules behind the agents, slowest first, so they load while the UI is already served.
+AGENT_STACK_MODULES = (
+    "crewai",
+    "crewai_tools",
+    "langchain_openai",
+    "langchain_community.agent_toolkits",
+    "openapi_spec_validator",
+    "aiagents.panel_utils.panel_utils",
+    "aiagents.cml_agents.tools",
+    "aiagents.crew.crew",
+)
+
+
+class AgentStack:
+    """
+    Loads the agent stack on a background thread. `start` returns at once; `load`
+    waits for the stack and returns the aiagents.crew module to start crews with.
+    `on_loaded` runs on the loading thread once every module is imported, before
+    anyone waiting in `load` is released.
+    """
+
+    def __init__(self, on_loaded: Callable[[], None] = None) -> None:
+        self.on_loaded = on_loaded
+        self.timings: Dict[str, float] = {}
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            for name in AGENT_STACK_MODULES:
+                start = perf_counter()
+                import_module(name)
+                self.timings[name] = perf_counter() - start
+            if self.on_loaded:
+                self.on_loaded()
+            print(
+                f"Agent stack loaded in {sum(self.timings.values()):.2f}s: "
+                + ", ".join(f"{name} {elapsed:.2f}s" for name, elapsed in self.timings.items())
+            )
+        except BaseException as error:
+            self._error = error
+            raise
+        finally:
+            self._ready.set()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._load, name="agent-stack-warmup", daemon=True)
+                self._thread.start()
+
+    def ready(self) -> bool:
+        return self._ready.is_set() and self._error is None
+
+    def load(self):
+        self.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise RuntimeError("Loading the agent stack failed") from self._error
+        return import_module("aiagents.crew")
@@ -0,0 +1,64 @@
+"""
+Measures the throughput of API calls made one after another through the pooled
+APIClient against the same calls made as one concurrent batch, using a local
+stub HTTP server that answers every request after a fixed delay.
+
+    python benchmarks/api_batch_benchmark.py [calls] [latency in ms] [max per host]
+"""
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from time import perf_counter, sleep
+
+from aiagents.cml_agents.http_client import call_batch, get_api_client
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.05
+
+    def do_GET(self):
+        sleep(self.latency)
+        # every tenth item fails, to exercise the partial failure reporting
+        status = 500 if self.path.endswith("0") else 200
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main(calls=100, latency_ms=50, max_per_host=8):
+    StubHandler.latency = latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    batch = [{"path": f"/items/{i}", "method": "GET", "parameters": {}} for i in range(calls)]
+
+    client = get_api_client(base_url)
+    start = perf_counter()
+    for call in batch:
+        client.request(call["method"], call["path"], call["parameters"])
+    sequential = perf_counter() - start
+    # the batch has to reach the server as well, not the GET cache filled above
+    client.cache.clear()
+
+    start = perf_counter()
+    results = call_batch(base_url, batch, max_per_host=max_per_host)
+    concurrent = perf_counter() - start
+    server.shutdown()
+
+    assert [result["path"] for result in results] == [call["path"] for call in batch]
+    failed = sum(not result["ok"] for result in results)
+    print(f"{calls} calls, {latency_ms}ms server latency, {max_per_host} in flight per host")
+    print(f"sequential: {sequential:.2f}s, {calls / sequential:.1f} calls/s")
+    print(f"     batch: {concurrent:.2f}s, {calls / concurrent:.1f} calls/s, {failed} failed")
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:4]))
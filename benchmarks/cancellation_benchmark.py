@@ -0,0 +1,114 @@
+"""
+Measures what stopping a crew thread costs: the crew-like workload (JSON handling
+and prompt building) run on a plain thread, on the sys.settrace based thread the
+crews used to run on, and on a CrewWorker; then how long a CrewWorker takes to
+stop once killed while it waits for the user or for a slow API.
+
+    python benchmarks/cancellation_benchmark.py [iterations]
+"""
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps, loads
+from time import perf_counter, sleep
+
+from aiagents.cml_agents.http_client import APIClient
+from aiagents.custom_threading.handoff import HumanInputChannel
+from aiagents.custom_threading.threads import CrewWorker
+
+
+class TracedThread(threading.Thread):
+    """The thread the crews used to run on: every line is traced to check for a kill."""
+
+    def __init__(self, *args, **keywords):
+        threading.Thread.__init__(self, *args, **keywords)
+        self.killed = False
+
+    def run(self):
+        sys.settrace(self.globaltrace)
+        threading.Thread.run(self)
+
+    def globaltrace(self, frame, event, arg):
+        return self.localtrace if event == "call" else None
+
+    def localtrace(self, frame, event, arg):
+        if self.killed and event == "line":
+            raise SystemExit()
+        return self.localtrace
+
+    def kill(self):
+        self.killed = True
+
+
+def validate(operation):
+    # the kind of pure Python field checking pydantic and the output parsers do
+    for field in ("path", "method", "summary"):
+        if not isinstance(operation.get(field), str):
+            raise ValueError(field)
+    return all(isinstance(parameter, int) for parameter in operation["parameters"])
+
+
+def workload(iterations):
+    operations = [
+        {"path": f"/api/v2/projects/{i}", "method": "GET", "summary": f"Get project {i}", "parameters": list(range(20))}
+        for i in range(50)
+    ]
+    for _ in range(iterations):
+        prompt = "\n".join(
+            f"{op['method']} {op['path']}: {op['summary']}" for op in loads(dumps(operations)) if validate(op)
+        )
+        prompt.lower().split()
+
+
+def timed_thread(thread_class, iterations, repeat=3):
+    best = None
+    for _ in range(repeat):
+        thread = thread_class(target=workload, args=(iterations,), daemon=True)
+        start = perf_counter()
+        thread.start()
+        thread.join()
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        sleep(5)
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def stop_latency(target):
+    worker = CrewWorker(target=target, daemon=True)
+    worker.start()
+    sleep(0.2)
+    start = perf_counter()
+    worker.kill()
+    worker.join()
+    return perf_counter() - start
+
+
+def main(iterations=300):
+    plain = timed_thread(threading.Thread, iterations)
+    traced = timed_thread(TracedThread, iterations)
+    worker = timed_thread(CrewWorker, iterations)
+    print(f"workload of {iterations} iterations, best of 3")
+    print(f"  plain thread: {plain:.2f}s")
+    print(f" traced thread: {traced:.2f}s ({traced / plain:.1f}x)")
+    print(f"    CrewWorker: {worker:.2f}s ({worker / plain:.1f}x)")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = APIClient(f"http://127.0.0.1:{server.server_port}")
+    print("time to stop a killed CrewWorker")
+    print(f"  waiting for the user: {stop_latency(HumanInputChannel().get) * 1000:.1f}ms")
+    print(f"  waiting for the API:  {stop_latency(lambda: client.request('GET', '/slow')) * 1000:.1f}ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
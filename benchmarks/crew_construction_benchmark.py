@@ -0,0 +1,45 @@
+"""
+Measures how long it takes to get the interaction agents, tasks and crews ready for
+a new conversation: built from scratch, as StartCrewInteraction used to do for every
+query, against handed out again by the crew factory.
+
+No LLM is called, a placeholder OpenAI key is used when none is configured.
+
+    python benchmarks/crew_construction_benchmark.py [repeat]
+"""
+import sys
+from os import environ
+from time import perf_counter
+
+environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from aiagents.config import configuration
+from aiagents.crew.factory import CrewFactory, InteractionCrew
+
+
+def timed(build, repeat):
+    start = perf_counter()
+    for _ in range(repeat):
+        build()
+    return (perf_counter() - start) / repeat
+
+
+def main(repeat=20):
+    configuration.openai_provider = "OPENAI"
+    configuration.update_configuration()
+    factory = CrewFactory()
+
+    start = perf_counter()
+    factory.get(configuration)
+    first = perf_counter() - start
+    rebuilt = timed(lambda: InteractionCrew(configuration), repeat)
+    reused = timed(lambda: factory.get(configuration), repeat)
+
+    print(f"averaged over {repeat} conversations")
+    print(f"   first build: {first * 1000:.1f}ms")
+    print(f"rebuilt always: {rebuilt * 1000:.1f}ms per conversation")
+    print(f"factory reused: {reused * 1000:.3f}ms per conversation")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,45 @@
+"""
+Compares the SpecSerializer with the CustomJSONEncoder it replaced by serializing
+every path chunk of a dereferenced API Specification file.
+
+    python benchmarks/serializer_benchmark.py <swagger file> [repeat]
+"""
+import json
+import sys
+from time import perf_counter
+
+from aiagents.cml_agents.parse_for_manager import (
+    CustomJSONEncoder,
+    read_swagger_file,
+    split_swagger_by_paths,
+)
+from aiagents.cml_agents.spec_serializer import SpecSerializer
+
+
+def run(encode, chunks, repeat):
+    failures = 0
+    size = 0
+    start = perf_counter()
+    for _ in range(repeat):
+        for chunk in chunks:
+            try:
+                size += len(encode(chunk))
+            except ValueError:
+                failures += 1
+    return (perf_counter() - start) / repeat, size // repeat, failures // repeat
+
+
+def main(swagger_file_location, repeat=3):
+    chunks = list(split_swagger_by_paths(read_swagger_file(swagger_file_location)).values())
+    encoders = {
+        "CustomJSONEncoder": lambda chunk: json.dumps(chunk, cls=CustomJSONEncoder, indent=2),
+        "SpecSerializer": SpecSerializer(indent=2).encode,
+    }
+    print(f"{len(chunks)} chunks, averaged over {repeat} runs")
+    for name, encode in encoders.items():
+        elapsed, size, failures = run(encode, chunks, repeat)
+        print(f"{name:>18}: {elapsed:.3f}s, {size / 1024:.0f} KiB written, {failures} chunks failed")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 3)
@@ -0,0 +1,56 @@
+"""
+Measures how long the application takes before it can serve the UI: importing
+panel_start, which now loads the agent stack in the background, against importing
+the agent stack up front as it used to. Each import runs in a fresh interpreter with
+`-X importtime`, and the modules with the highest cumulative import time are listed.
+
+    python benchmarks/startup_benchmark.py [top]
+"""
+import subprocess
+import sys
+from os.path import abspath, dirname
+from time import perf_counter
+
+ROOT = dirname(dirname(abspath(__file__)))
+
+UI_READY = "import panel_start"
+EAGER = "import aiagents.crew.crew, aiagents.panel_utils.panel_utils"
+WARMUP = "import panel_start; panel_start.agent_stack.load()"
+
+
+def timed_import(statement):
+    """Runs `statement` in a fresh interpreter, returns its wall time and -X importtime report."""
+    start = perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{statement!r} failed:\n{result.stderr[-2000:]}")
+    return elapsed, result.stderr
+
+
+def cumulative_times(report):
+    times = {}
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, _, cumulative, module = [part.strip() for part in line.split("|")]
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+def main(top=10):
+    for label, statement in (("ui ready", UI_READY), ("eager stack", EAGER), ("warmed up", WARMUP)):
+        elapsed, report = timed_import(statement)
+        print(f"{label:>12}: {elapsed:.2f}s  ({statement})")
+        slowest = sorted(cumulative_times(report).items(), key=lambda item: item[1], reverse=True)
+        for module, microseconds in slowest[:top]:
+            print(f"{'':>14}{microseconds / 1e6:6.2f}s  {module}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,97 @@
+import copy
+import json
+import os
+
+import pytest
+
+from aiagents.cml_agents.parse_for_manager import (
+    DEFINITIONS_FOLDER_NAME,
+    iter_document_paths,
+    iter_swagger_paths,
+    swagger_parser,
+)
+
+
+SPEC = {
+    "openapi": "3.0.0",
+    "info": {"title": "Projects", "version": "1"},
+    "paths": {
+        "/projects": {
+            "get": {
+                "summary": "List projects",
+                "responses": {
+                    "200": {
+                        "description": "The projects",
+                        "content": {
+                            "application/json": {"schema": {"$ref": "#/components/schemas/Project"}}
+                        },
+                    }
+                },
+            }
+        }
+    },
+    "components": {
+        "schemas": {"Project": {"type": "object", "properties": {"name": {"type": "string"}}}}
+    },
+}
+
+
+def write_spec(directory):
+    with open(os.path.join(directory, "projects.json"), "w") as file:
+        json.dump(SPEC, file)
+
+
+def test_parsed_document_with_shared_definitions(tmp_path):
+    write_spec(tmp_path)
+    generated = tmp_path / "generated"
+    generated.mkdir()
+
+    swagger_parser(
+        "projects.json", str(tmp_path), str(generated),
+        streaming=False, workers=1, shared_definitions=True, document=SPEC,
+    )
+
+    assert os.listdir(generated / "projects" / DEFINITIONS_FOLDER_NAME)
+    assert (generated / "projects_metadata.json").exists()
+
+
+def test_parsed_document_matches_reading_the_file(tmp_path):
+    write_spec(tmp_path)
+    from_document, from_file = tmp_path / "from_document", tmp_path / "from_file"
+    from_document.mkdir()
+    from_file.mkdir()
+
+    swagger_parser("projects.json", str(tmp_path), str(from_document), shared_definitions=True, document=SPEC)
+    swagger_parser("projects.json", str(tmp_path), str(from_file), shared_definitions=True)
+
+    definitions = os.listdir(from_file / "projects" / DEFINITIONS_FOLDER_NAME)
+    chunks = ["_projects.json"] + [os.path.join(DEFINITIONS_FOLDER_NAME, name) for name in definitions]
+    for chunk in chunks:
+        with open(from_document / "projects" / chunk) as document_chunk:
+            with open(from_file / "projects" / chunk) as file_chunk:
+                assert json.load(document_chunk) == json.load(file_chunk)
+
+
+def spec_with_path_reference():
+    spec = copy.deepcopy(SPEC)
+    spec["paths"]["/projects/all"] = {"get": {"$ref": "#/paths/~1projects/get"}}
+    return spec
+
+
+def test_streaming_warns_about_references_into_paths(tmp_path):
+    spec = spec_with_path_reference()
+    location = tmp_path / "projects.json"
+    location.write_text(json.dumps(spec))
+
+    with pytest.warns(UserWarning, match="#/paths/~1projects/get"):
+        paths = dict(iter_swagger_paths(str(location)))
+
+    assert paths["/projects/all"]["get"] == {"$ref": "#/paths/~1projects/get"}
+
+
+def test_parsed_document_resolves_references_into_paths():
+    spec = spec_with_path_reference()
+
+    paths = dict(iter_document_paths(spec))
+
+    assert paths["/projects/all"]["get"]["summary"] == "List projects"
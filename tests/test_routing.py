@@ -0,0 +1,32 @@
+from aiagents.cml_agents.routing import route_spec, spec_names
+
+
+SUMMARIES = {
+    "/generated/jobs_metadata.json": "Jobs API",
+    "/generated/projects_metadata.json": "Projects API",
+    "/generated/cml_swagger_metadata.json": "Workbench API",
+}
+
+
+def test_generic_word_does_not_route():
+    assert route_spec(SUMMARIES, "list my jobs", aliases={}) is None
+    assert route_spec(SUMMARIES, "create a project in projects", aliases={}) is None
+
+
+def test_file_name_routes():
+    decision = route_spec(SUMMARIES, "use jobs.json to list my jobs", aliases={})
+    assert decision["file_location"] == "/generated/jobs_metadata.json"
+
+
+def test_several_word_bucket_name_routes():
+    decision = route_spec(SUMMARIES, "with the cml swagger, list my jobs", aliases={})
+    assert decision["file_location"] == "/generated/cml_swagger_metadata.json"
+
+
+def test_alias_routes():
+    decision = route_spec(SUMMARIES, "list my jobs on the scheduler", aliases={"scheduler": "jobs.json"})
+    assert decision["file_location"] == "/generated/jobs_metadata.json"
+
+
+def test_single_word_bucket_is_not_a_name():
+    assert spec_names("/generated/jobs_metadata.json") == {"jobs.json"}
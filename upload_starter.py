@@ -1,41 +1,77 @@
-from fastapi import FastAPI, File, UploadFile
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from aiagents.crew import StartCrewInitialization
-from aiagents.config import configuration
+from aiagents.config import Initialize, configuration
+from aiagents.crew.jobs import IngestionJob, IngestionQueue
+from aiagents.cml_agents.spec_upload import SpecUploadError, StreamingSpecWriter, UPLOAD_CHUNK_BYTES
 app = FastAPI()
 from uuid import uuid4
 import traceback
 import json
-from os import path, makedirs
+
+
+def ingest(job: IngestionJob):
+    # every job works on its own configuration, so concurrent uploads do not share state
+    from aiagents.crew import ingest_specification
+
+    session = Initialize()
+    session.new_file_name = job.file_name
+    session.update_config_upload()
+    with configuration.use(session):
+        ingest_specification(
+            session, job.file_name, progress=job.update, document=job.document, source_hash=job.digest
+        )
+
+
+ingestion_jobs = IngestionQueue(ingest)
 
 
 @app.post("/upload-json/")
 async def upload_json(file: UploadFile = File(...)):
+    # The upload is streamed to a temporary file and checked on the way, then moved
+    # into the Swagger files directory, without holding it in memory as a whole
+    writer = StreamingSpecWriter(configuration.swagger_files_directory)
     try:
-        # Read the contents of the uploaded JSON file
-        contents = await file.read()
-        if not path.exists(configuration.swagger_files_directory):
-            makedirs(configuration.swagger_files_directory)
-        # Save the uploaded Swagger file in the designated directory
-        file_path = path.join(
-            configuration.swagger_files_directory, file.filename
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            await run_in_threadpool(writer.write, chunk)
+        await run_in_threadpool(writer.close)
+    except SpecUploadError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    except Exception as e:
+        writer.discard()
+        traceback.print_exc()
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+
+    try:
+        # The file is ingested in the background, the job id is returned right away
+        job, created = await run_in_threadpool(
+            ingestion_jobs.submit,
+            file.filename,
+            writer.digest,
+            lambda: writer.commit(file.filename),
+            writer.document,
         )
-        # need to handle duplicate summary stuff
-        file_content = json.loads(contents.decode())
-        with open(file_path, "w") as file:
-            json.dump(file_content, file, indent=4)
-        try:
-
-        # You can parse the JSON here
-            configuration.update_config_upload()
-            StartCrewInitialization(configuration)
-        except Exception as e:
-            traceback.print_exc()
-            error_trace = traceback.format_exc()
-            return JSONResponse(content={"error": error_trace}, status_code=400)
-        # Process the data as needed
-        return JSONResponse(content={"message": "JSON received and crew summary completed successfuly"})
+        if not created:
+            writer.discard()
+        return JSONResponse(content={**job.status_dict(), "duplicate": not created}, status_code=202)
     except Exception as e:
+        writer.discard()
+        traceback.print_exc()
         return JSONResponse(content={"error": str(e)}, status_code=400)
-    
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return JSONResponse(content=job.status_dict())
+
+
+@app.get("/jobs/{job_id}/progress")
+async def job_progress(job_id: str):
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return JSONResponse(content=job.progress_dict())